@@ -0,0 +1,164 @@
+##
+# @file areaDetector.py
+# @brief Detector de movimento rápido por redimensionamento INTER_AREA
+#
+#  Redimensionar o frame em escala de cinza direto para a grade de chunks (40x30)
+#  com interpolação por área é essencialmente o cálculo das médias dos chunks,
+#  feito pelo código otimizado do OpenCV. A diferença para a FSM é o arredondamento:
+#  o INTER_AREA arredonda a média, enquanto o shift right (>> 8) a trunca.
+#  O relatório de precisão (accuracyReport) mede o impacto disso em relação ao
+#  resultado inteiro exato da FSM.
+#
+
+from cv2 import resize, INTER_AREA
+import numpy as np
+from integralDetector import IntegralMotionDetector, toGray
+
+class AreaMotionDetector():
+
+    ## @brief Instanciador da classe AreaMotionDetector
+    #
+    def __init__(self,
+                 chunk_lines = 30,
+                 chunk_columns = 40,
+                 threshold = 15,
+                 motion_percent = 25):
+
+        # Define os parametros de detecção
+        self.chunk_lines = chunk_lines
+        self.chunk_columns = chunk_columns
+        self.thresh = threshold
+        self.min_am = chunk_lines * chunk_columns * motion_percent // 100
+
+        print(f"AreaMotionDetector:\n\
+        \tthreshold = {self.thresh},\n\
+        \tchunk_lines = {self.chunk_lines},\n\
+        \tchunk_columns = {self.chunk_columns},\n\
+        \tmin_am = {self.min_am}")
+
+        # Acumulador de movimento do último par
+        self.am = 0
+
+        # Máscara binária de movimento dos chunks do último par
+        self.mask = np.zeros((self.chunk_lines, self.chunk_columns), dtype=bool)
+
+        # Médias dos chunks dos dois frames do último par
+        self.means = np.zeros((2, self.chunk_lines, self.chunk_columns), dtype=np.uint8)
+
+    ## @brief Calcula a matriz de médias dos chunks de um frame
+    #
+    def chunkMeans(self, frame):
+
+        return resize(toGray(frame), (self.chunk_columns, self.chunk_lines),
+                      interpolation=INTER_AREA)
+
+    ## @brief Processa um par de frames e retorna o acumulador de movimento
+    #
+    def detect(self, frame1, frame2):
+
+        self.means[0] = self.chunkMeans(frame1)
+        self.means[1] = self.chunkMeans(frame2)
+
+        mc1 = self.means[0].astype(np.int16)
+        mc2 = self.means[1].astype(np.int16)
+
+        # Módulo da diferença seguido da limiarização
+        self.mask = np.abs(mc1 - mc2) > self.thresh
+        self.am = int(np.count_nonzero(self.mask))
+
+        return self.am
+
+    ## @brief Verifica se houve movimento no último par processado
+    #
+    def verificaMovimento(self):
+
+        if self.am >= self.min_am:
+            return 1
+        else:
+            return 0
+
+## @brief Compara o AreaMotionDetector com o resultado inteiro exato da FSM
+#
+#  pairs: iterável de pares de frames (BGR ou escala de cinza) de 640x480
+#  Retorna um dicionário com a concordância das decisões, dos chunks e o erro em am.
+#
+def accuracyReport(pairs, threshold = 15):
+
+    # A grade 16x16 com passo 16 reproduz exatamente a FSM
+    exact = IntegralMotionDetector(grids = [(16, 16, 16, 16)], threshold = threshold)
+    fast = AreaMotionDetector(threshold = threshold)
+
+    report = {'pairs': 0,
+              'decision_agreement': 0.0,
+              'false_positives': 0,
+              'false_negatives': 0,
+              'chunk_agreement': 0.0,
+              'am_mean_abs_error': 0.0,
+              'am_max_abs_error': 0}
+
+    chunks_equal = 0
+    chunks_total = 0
+    decisions_equal = 0
+    error_sum = 0
+
+    for frame1, frame2 in pairs:
+
+        am_exact = exact.detect(frame1, frame2)
+        am_fast = fast.detect(frame1, frame2)
+
+        result_exact = exact.verificaMovimento()
+        result_fast = fast.verificaMovimento()
+
+        # Contabiliza as decisões
+        if result_exact == result_fast:
+            decisions_equal += 1
+        elif result_fast == 1:
+            report['false_positives'] += 1
+        else:
+            report['false_negatives'] += 1
+
+        # Contabiliza os chunks e o erro em am
+        chunks_equal += int(np.count_nonzero(exact.masks[0] == fast.mask))
+        chunks_total += fast.mask.size
+        error_sum += abs(am_fast - am_exact)
+        report['am_max_abs_error'] = max(report['am_max_abs_error'], abs(am_fast - am_exact))
+
+        report['pairs'] += 1
+
+    if report['pairs'] > 0:
+        report['decision_agreement'] = decisions_equal / report['pairs']
+        report['chunk_agreement'] = chunks_equal / chunks_total
+        report['am_mean_abs_error'] = error_sum / report['pairs']
+
+    return report
+
+if __name__ == "__main__":
+
+    # Recebendo os argumentos
+    import argparse
+    from cv2 import VideoCapture
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-pth", "--capture_path", required=True,
+    help="Caminho para o vídeo usado no relatório de precisão")
+    ap.add_argument("-n", "--pairs", required=False, type=int, default=100,
+    help="Quantidade máxima de pares de frames comparados")
+    args = vars(ap.parse_args())
+
+    cap = VideoCapture(args["capture_path"])
+
+    ## @brief Gera os pares de frames do vídeo
+    #
+    def framePairs():
+        for i in range(args["pairs"]):
+            ret1, frame1 = cap.read()
+            ret2, frame2 = cap.read()
+            if not (ret1 and ret2):
+                break
+            yield frame1, frame2
+
+    report = accuracyReport(framePairs())
+    cap.release()
+
+    print('Relatório de precisão (INTER_AREA x FSM):')
+    for key, value in report.items():
+        print(f'\t{key} = {value}')
@@ -0,0 +1,265 @@
+##
+# @file asyncPipeline.py
+# @brief Pipeline assíncrono (asyncio) de captura e detecção para várias fontes
+#
+#  As chamadas bloqueantes do VideoCapture de cada fonte rodam em uma thread própria
+#  (um executor de uma thread por fonte, o que também serializa leitura e liberação),
+#  e a detecção roda em um executor comum. Um semáforo limita apenas quantos pares
+#  são detectados ao mesmo tempo (o uso de CPU): todas as fontes continuam lendo,
+#  então centenas de fontes pouco ativas podem ser multiplexadas em um único laço de
+#  eventos sem que os buffers das câmeras fiquem defasados. O encerramento é feito
+#  por cancelamento das tarefas, em vez de KeyboardInterrupt.
+#
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from cv2 import VideoCapture
+from exception import CaptureError
+from integralDetector import toGray
+
+class AsyncFrameSource():
+
+    ## @brief Instanciador da classe AsyncFrameSource
+    #
+    #  fps_percent: porcentagem dos frames da fonte utilizada (como no FrameCapture)
+    #
+    #  Todas as chamadas ao VideoCapture passam pelo executor de uma thread da fonte:
+    #  o OpenCV não permite liberar o objeto enquanto outra thread lê dele, e assim
+    #  a liberação espera a leitura em andamento (inclusive após um cancelamento).
+    #
+    def __init__(self,
+                 capture_path,
+                 fps_percent = 100,
+                 gray = True):
+
+        # Tratando o caminho de captura pra webcam
+        self.path = 0 if capture_path == '0' else capture_path
+        self.fps_percent = fps_percent
+        self.gray = gray
+        self.executor = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = 'asyncFrameSource')
+
+        # O VideoCapture só é aberto em open()
+        self.cap = None
+
+    ## @brief Abre a fonte de captura no executor
+    #
+    async def open(self):
+
+        loop = asyncio.get_running_loop()
+        self.cap = await loop.run_in_executor(self.executor, VideoCapture, self.path)
+
+        if not self.cap.isOpened():
+            raise CaptureError(f'open error ({self.path})')
+
+    ## @brief Leitura bloqueante de um frame (executada no executor)
+    #
+    def capture(self):
+
+        # Descarta os frames de acordo com o fps_percent
+        for j in range(int(100/self.fps_percent) - 1):
+            if not self.cap.grab():
+                raise CaptureError('grab error')
+
+        ret, frame = self.cap.read()
+
+        if not ret:
+            raise CaptureError('read error')
+
+        return toGray(frame) if self.gray else frame
+
+    ## @brief Lê um frame da fonte sem bloquear o laço de eventos
+    #
+    async def read(self):
+
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(self.executor, self.capture)
+
+    ## @brief Libera o objeto VideoCapture (depois de qualquer leitura em andamento)
+    #
+    async def close(self):
+
+        if self.cap is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, self.cap.release)
+            self.cap = None
+
+        self.executor.shutdown(wait = False)
+
+    async def __aenter__(self):
+
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+
+        await self.close()
+
+## @brief Processa um par de frames no executor e retorna (am, resultado)
+#
+async def detectPair(md, frame1, frame2, executor = None):
+
+    loop = asyncio.get_running_loop()
+    am = await loop.run_in_executor(executor, md.detect, frame1, frame2)
+
+    return am, md.verificaMovimento()
+
+## @brief Iterador assíncrono dos resultados de uma fonte
+#
+#  Gera (sequência, am, resultado) para cada par de frames até a fonte terminar.
+#  O limiter (asyncio.Semaphore) é mantido apenas durante a detecção: a leitura
+#  espera a câmera e não usa CPU.
+#
+async def motionResults(source, md, limiter = None, executor = None):
+
+    limiter = limiter if limiter is not None else asyncio.Semaphore(1)
+    sequence = 0
+
+    while True:
+
+        try:
+            frame1 = await source.read()
+            frame2 = await source.read()
+
+            async with limiter:
+                am, result = await detectPair(md, frame1, frame2, executor)
+
+        # Fim do vídeo ou falha da fonte
+        except CaptureError as err:
+            print(f'motionResults: {err}')
+            return
+
+        yield sequence, am, result
+        sequence += 1
+
+## @brief Cria um detector rápido de acordo com o modo
+#
+def newDetector(mode):
+
+    if mode == 'area':
+        from areaDetector import AreaMotionDetector
+        return AreaMotionDetector()
+    else:
+        from integralDetector import IntegralMotionDetector
+        return IntegralMotionDetector()
+
+class AsyncMotionPipeline():
+
+    ## @brief Instanciador da classe AsyncMotionPipeline
+    #
+    #  capture_paths: lista de caminhos das fontes de captura
+    #  concurrency: quantidade máxima de pares sendo detectados ao mesmo tempo
+    #
+    def __init__(self,
+                 capture_paths,
+                 concurrency = 8,
+                 fps_percent = 100,
+                 mode = 'integral',
+                 max_queue = 100):
+
+        self.paths = list(capture_paths)
+        self.concurrency = concurrency
+        self.fps_percent = fps_percent
+        self.mode = mode
+        self.max_queue = max_queue
+
+        print(f"AsyncMotionPipeline:\n\
+        \tsources = {len(self.paths)},\n\
+        \tconcurrency = {self.concurrency},\n\
+        \tmode = {self.mode}")
+
+    ## @brief Tarefa de uma fonte: envia os resultados para a fila comum
+    #
+    async def runSource(self, path, limiter, executor, queue):
+
+        source = AsyncFrameSource(path, self.fps_percent)
+
+        try:
+            await source.open()
+            md = newDetector(self.mode)
+            async for sequence, am, result in motionResults(source, md, limiter, executor):
+                await queue.put((path, sequence, am, result))
+
+        except CaptureError as err:
+            print(f'runSource: {err}')
+
+        # Libera a fonte inclusive quando a tarefa é cancelada
+        finally:
+            await asyncio.shield(source.close())
+
+    ## @brief Inicia as tarefas de todas as fontes
+    #
+    async def __aenter__(self):
+
+        self.limiter = asyncio.Semaphore(self.concurrency)
+        self.queue = asyncio.Queue(maxsize = self.max_queue)
+
+        # Threads da detecção (cada fonte tem a sua thread de leitura)
+        self.executor = ThreadPoolExecutor(max_workers = self.concurrency)
+
+        self.tasks = [asyncio.create_task(self.runSource(path, self.limiter, self.executor, self.queue))
+                      for path in self.paths]
+
+        # Tarefa que sinaliza o fim de todas as fontes
+        async def finish():
+            await asyncio.gather(*self.tasks, return_exceptions = True)
+            await self.queue.put(None)
+
+        self.finisher = asyncio.create_task(finish())
+
+        return self
+
+    ## @brief Cancela as fontes ao sair do bloco (fim, erro ou cancelamento)
+    #
+    async def __aexit__(self, *exc):
+
+        for task in self.tasks:
+            task.cancel()
+        self.finisher.cancel()
+
+        await asyncio.gather(*self.tasks, self.finisher, return_exceptions = True)
+        self.executor.shutdown(wait = False)
+
+    ## @brief Iterador assíncrono com os resultados (caminho, sequência, am, resultado) de todas as fontes
+    #
+    def __aiter__(self):
+
+        return self
+
+    async def __anext__(self):
+
+        item = await self.queue.get()
+
+        if item is None:
+            raise StopAsyncIteration
+
+        return item
+
+if __name__ == "__main__":
+
+    # Recebendo os argumentos
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-pth", "--capture_paths", required=True, nargs="+",
+    help="Caminhos para as fontes de captura")
+    ap.add_argument("-concurrency", "--concurrency", required=False, type=int, default=8,
+    help="Quantidade máxima de pares sendo detectados ao mesmo tempo")
+    ap.add_argument("-fps_percent", "--fps_percent", required=False, type=int, default=100,
+    help="Porcentagem do FPS das fontes utilizada (valor entre 0 e 100)")
+    ap.add_argument("-mode", "--mode", required=False, default="integral", choices=["integral", "area"],
+    help="Detector utilizado")
+    args = vars(ap.parse_args())
+
+    async def main():
+        async with AsyncMotionPipeline(args["capture_paths"],
+                                       concurrency = args["concurrency"],
+                                       fps_percent = args["fps_percent"],
+                                       mode = args["mode"]) as pipeline:
+            async for path, sequence, am, result in pipeline:
+                print(f'{path}: par = {sequence}, am = {am}, result = {result}')
+
+    # O Ctrl+C cancela a tarefa principal e as fontes são liberadas no cancelamento
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print('main: pipeline cancelado')
@@ -0,0 +1,278 @@
+##
+# @file batchScan.py
+# @brief Varredura em lote de arquivos de vídeo gravados
+#
+#  Recebe diretórios e/ou padrões glob, processa os arquivos em paralelo em um pool
+#  de processos e grava uma linha de resumo por arquivo (frames, segmentos de
+#  movimento, am máximo, vazão) em CSV ou JSON Lines. Cada linha é gravada assim
+#  que o arquivo termina, então uma varredura interrompida continua de onde parou:
+#  os arquivos já presentes na saída são ignorados.
+#
+#  Cada arquivo é lido por um FrameCapture e os pares são processados como no laço
+#  principal do motionDetector_FSM, com as decisões suavizadas pelo MotionSmoother.
+#
+
+import contextlib
+import csv
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from queue import Queue, Empty
+from time import perf_counter
+
+# Extensões procuradas nos diretórios
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov')
+
+# Colunas da linha de resumo
+FIELDS = ['file', 'frames', 'pairs', 'motion_pairs', 'segments', 'max_am',
+          'seconds', 'fps', 'error']
+
+## @brief Lista os arquivos de vídeo dos diretórios e padrões glob informados
+#
+def findVideos(paths, extensions = VIDEO_EXTENSIONS):
+
+    files = []
+
+    for path in paths:
+
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                files += [os.path.join(root, name) for name in names
+                          if name.lower().endswith(extensions)]
+        else:
+            files += [name for name in glob.glob(path, recursive=True) if os.path.isfile(name)]
+
+    # Caminhos absolutos, sem repetições e em ordem estável
+    return sorted(set(os.path.abspath(name) for name in files))
+
+## @brief Lê os arquivos já processados em uma saída existente
+#
+#  Linhas incompletas no fim do arquivo (varredura interrompida) são ignoradas.
+#
+def doneFiles(output):
+
+    done = set()
+
+    if not os.path.exists(output):
+        return done
+
+    with open(output, newline='') as fd:
+
+        if output.endswith('.csv'):
+            for row in csv.DictReader(fd):
+                if row.get('file') and row.get('error') is not None:
+                    done.add(row['file'])
+        else:
+            for line in fd:
+                try:
+                    done.add(json.loads(line)['file'])
+                except (ValueError, KeyError):
+                    continue
+
+    return done
+
+## @brief Processa um arquivo de vídeo e retorna a sua linha de resumo
+#
+#  Executado nos processos do pool; as mensagens das classes são descartadas.
+#
+def scanFile(path,
+             mode = 'integral',
+             fps = 15,
+             fps_percent = 100,
+             resolution = [640, 480],
+             am_on = 300,
+             am_off = 250,
+             min_on = 2,
+             min_off = 5):
+
+    row = dict.fromkeys(FIELDS, 0)
+    row['file'] = path
+    row['error'] = ''
+
+    with contextlib.redirect_stdout(open(os.devnull, 'w')) as devnull:
+
+        # Importados no processo de trabalho
+        from motionDetector_FSM import FrameCapture, MotionSmoother
+        from exception import Motion, NoMotion
+
+        if mode == 'area':
+            from areaDetector import AreaMotionDetector
+            md = AreaMotionDetector()
+        else:
+            from integralDetector import IntegralMotionDetector
+            md = IntegralMotionDetector()
+
+        ms = MotionSmoother(on_threshold = am_on,
+                            off_threshold = am_off,
+                            min_on = min_on,
+                            min_off = min_off)
+
+        fifo = Queue(maxsize=20)
+        fc = FrameCapture(capture_path = path,
+                          fifo_out = fifo,
+                          fps = fps,
+                          fps_percent = fps_percent,
+                          resolution = resolution,
+                          event_time = 0,
+                          gray = True)
+
+        start = perf_counter()
+        fc.start()
+
+        frame1 = None
+
+        try:
+
+            while True:
+
+                # O fim do arquivo pausa a thread de captura (CaptureError)
+                try:
+                    frame = fifo.get(timeout = 0.05)
+                except Empty:
+                    if not fc.ready.is_set():
+                        break
+                    continue
+
+                row['frames'] += 1
+
+                if frame1 is None:
+                    frame1 = frame
+                    continue
+
+                # Processa o par de frames
+                am = md.detect(frame1, frame)
+                frame1 = None
+
+                row['pairs'] += 1
+                row['max_am'] = max(row['max_am'], am)
+                row['motion_pairs'] += md.verificaMovimento()
+
+                try:
+                    ms.update(am)
+                except Motion:
+                    row['segments'] += 1
+                except NoMotion:
+                    pass
+
+        except Exception as err:
+            row['error'] = f'{type(err).__name__}: {err}'
+
+        finally:
+            fc.stop()
+            # Aguarda a thread de captura terminar antes de liberar o VideoCapture
+            while fc.capture_thread.is_alive():
+                try:
+                    fifo.get(timeout = 0.1)
+                except Empty:
+                    pass
+            fc.free()
+            devnull.close()
+
+    row['seconds'] = round(perf_counter() - start, 3)
+    row['fps'] = round(row['frames'] / row['seconds'], 1) if row['seconds'] > 0 else 0.0
+
+    if row['frames'] == 0 and not row['error']:
+        row['error'] = 'nenhum frame lido'
+
+    return row
+
+## @brief Varre os arquivos em paralelo e grava as linhas de resumo em output
+#
+#  Retorna a quantidade de arquivos processados nesta execução.
+#
+def batchScan(paths, output, workers = None, **options):
+
+    files = findVideos(paths)
+    done = doneFiles(output)
+    pending = [name for name in files if name not in done]
+
+    print(f'batchScan: {len(files)} arquivos, {len(files) - len(pending)} já processados, {len(pending)} pendentes')
+
+    if not pending:
+        return 0
+
+    is_csv = output.endswith('.csv')
+    write_header = is_csv and (not os.path.exists(output) or os.path.getsize(output) == 0)
+
+    # Uma linha incompleta no fim (varredura interrompida) é terminada antes de continuar
+    if os.path.exists(output) and os.path.getsize(output) > 0:
+        with open(output, 'rb') as fd:
+            fd.seek(-1, os.SEEK_END)
+            if fd.read(1) != b'\n':
+                with open(output, 'a') as fa:
+                    fa.write('\n')
+
+    processed = 0
+
+    with open(output, 'a', newline='') as fd, ProcessPoolExecutor(max_workers = workers) as pool:
+
+        writer = csv.DictWriter(fd, fieldnames = FIELDS) if is_csv else None
+        if write_header:
+            writer.writeheader()
+
+        futures = {pool.submit(scanFile, name, **options): name for name in pending}
+
+        for future in as_completed(futures):
+
+            try:
+                row = future.result()
+            except Exception as err:
+                # Falha do processo de trabalho: o arquivo volta a ser tentado na próxima execução
+                print(f'batchScan: {futures[future]}: {err}')
+                continue
+
+            if is_csv:
+                writer.writerow(row)
+            else:
+                fd.write(json.dumps(row) + '\n')
+
+            # Cada linha vai para o disco assim que o arquivo termina
+            fd.flush()
+
+            processed += 1
+            print(f'batchScan: [{processed}/{len(pending)}] {row["file"]}: '
+                  f'{row["frames"]} frames, {row["segments"]} segmentos, '
+                  f'max_am = {row["max_am"]}, {row["fps"]} fps {row["error"]}')
+
+    return processed
+
+if __name__ == "__main__":
+
+    # Recebendo os argumentos
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-pth", "--paths", required=True, nargs="+",
+    help="Diretórios e/ou padrões glob dos vídeos (ex.: 'gravacoes/**/*.mp4')")
+    ap.add_argument("-out", "--output", required=True,
+    help="Arquivo de resumo: .csv ou JSON Lines (qualquer outra extensão)")
+    ap.add_argument("-workers", "--workers", required=False, type=int, default=None,
+    help="Quantidade de processos de trabalho (padrão: número de CPUs)")
+    ap.add_argument("-mode", "--mode", required=False, default="integral", choices=["integral", "area"],
+    help="Detector: imagem integral (exato, igual à FSM) ou INTER_AREA (aproximado)")
+    ap.add_argument("-fps", "--source_fps", required=False, type=int, default=15,
+    help="Velocidade de captura da fonte")
+    ap.add_argument("-fps_percent", "--fps_percent", required=False, type=float, default=100,
+    help="Porcentagem dos frames processados (arquivos .mp4 são sempre lidos inteiros)")
+    ap.add_argument("-am_on", "--am_on", required=False, type=int, default=300,
+    help="Limiar de am para ligar o estado de movimento")
+    ap.add_argument("-am_off", "--am_off", required=False, type=int, default=250,
+    help="Limiar de am para desligar o estado de movimento")
+    ap.add_argument("-min_on", "--min_on", required=False, type=int, default=2,
+    help="Pares consecutivos acima de am_on para ligar o movimento")
+    ap.add_argument("-min_off", "--min_off", required=False, type=int, default=5,
+    help="Pares consecutivos abaixo de am_off para desligar o movimento")
+    args = vars(ap.parse_args())
+
+    start = perf_counter()
+
+    processed = batchScan(args["paths"], args["output"], args["workers"],
+                          mode = args["mode"],
+                          fps = args["source_fps"],
+                          fps_percent = args["fps_percent"],
+                          am_on = args["am_on"],
+                          am_off = args["am_off"],
+                          min_on = args["min_on"],
+                          min_off = args["min_off"])
+
+    print(f'batchScan: {processed} arquivos em {perf_counter() - start:.1f} s')
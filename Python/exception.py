@@ -14,4 +14,7 @@ class MqttError(Exception):
     pass
 
 class EventReady(Exception):
+    pass
+
+class StallError(Exception):
     pass
\ No newline at end of file
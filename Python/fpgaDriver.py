@@ -0,0 +1,490 @@
+##
+# @file fpgaDriver.py
+# @brief Driver do IP motion_detector (PYNQ) e modelo simulado dos seus registradores
+#
+#  No modo empacotado (C_PIXELS_PER_WORD = 4 no wrapper AXI), quatro pixels de 8 bits
+#  seguem em uma única escrita de 32 bits em slv_reg2 (o primeiro pixel no byte menos
+#  significativo) e a própria escrita sinaliza os novos pixels para a FSM. O driver
+#  envia os pares de frames direto de buffers NumPy e só consulta os registradores
+#  de status ao final do par, em vez de várias transações MMIO por pixel.
+#
+#  O SimulatedMotionDetectorIP implementa o mesmo mapa de registradores (read/write),
+#  permitindo verificar o driver sem a placa.
+#
+
+from time import perf_counter
+import numpy as np
+from exception import SendError, StallError
+from integralDetector import IntegralMotionDetector, toGray
+
+# Endereço de cada registrador do IP
+# slv_reg0 (0x0)  -- Start (INPUT)
+start_addr = 0x0
+# slv_reg1 (0x4)  -- pixelAvailable (INPUT, apenas no modo original)
+pixelAvailable_addr = 0x4
+# slv_reg2 (0x8)  -- pixelValue (INPUT, 1 ou 4 pixels)
+pixelValue_addr = 0x8
+# slv_reg3 (0xc)  -- nextPixel (OUTPUT)
+nextPixel_addr = 0xc
+# slv_reg4 (0x10) -- pixelPosition (OUTPUT)
+pixelPosition_addr = 0x10
+# slv_reg5 (0x14) -- pixelAccumulator (OUTPUT)
+pixelAccumulator_addr = 0x14
+# slv_reg6 (0x18) -- motionAccumulator (OUTPUT)
+am_addr = 0x18
+# slv_reg7 (0x1c) -- ready (OUTPUT)
+ready_addr = 0x1c
+# slv_reg8 (0x20) -- result (OUTPUT)
+result_addr = 0x20
+# slv_reg9 (0x24) -- status do modo empacotado (OUTPUT): bit0 packed, bit1 overrun, bit2 wordValid
+status_addr = 0x24
+
+# Bits do registrador de status
+STATUS_PACKED = 0x1
+STATUS_OVERRUN = 0x2
+STATUS_WORD_VALID = 0x4
+
+## @brief Empacota um par de frames em palavras de 32 bits (4 pixels por palavra)
+#
+def packPair(frame1, frame2):
+
+    pixels = np.concatenate((np.ascontiguousarray(toGray(frame1)).reshape(-1),
+                             np.ascontiguousarray(toGray(frame2)).reshape(-1)))
+
+    # O primeiro pixel vai no byte menos significativo da palavra
+    return pixels.view('<u4')
+
+class MotionDetectorDriver():
+
+    ## @brief Instanciador da classe MotionDetectorDriver
+    #
+    #  ip: objeto com read(offset) e write(offset, value), como o DefaultIP/MMIO do
+    #      PYNQ ou o SimulatedMotionDetectorIP
+    #  timeout: tempo máximo, em segundos, esperando o IP
+    #  check_every: no modo empacotado, confere a palavra pendente a cada N escritas (0 desliga)
+    #  reset: função opcional que reseta o PL (ex.: um reset do overlay do PYNQ),
+    #         usada pelo restart() antes do start
+    #
+    def __init__(self,
+                 ip,
+                 timeout = 1.0,
+                 check_every = 0,
+                 reset = None):
+
+        self.ip = ip
+        self.timeout = timeout
+        self.check_every = check_every
+        self.reset = reset
+
+        # Verifica o modo do IP pelo registrador de status
+        self.packed = bool(self.ip.read(status_addr) & STATUS_PACKED)
+
+        print(f"MotionDetectorDriver:\n\
+        \tpacked = {self.packed},\n\
+        \ttimeout = {self.timeout},\n\
+        \tcheck_every = {self.check_every}")
+
+        # Resultado do último par
+        self.am = 0
+        self.result = 0
+
+    ## @brief Aguarda um registrador assumir um valor, respeitando o timeout
+    #
+    def waitFor(self, offset, value, mask = 0xFFFFFFFF):
+
+        limit = perf_counter() + self.timeout
+
+        while (self.ip.read(offset) & mask) != value:
+            if perf_counter() > limit:
+                raise StallError(f'timeout aguardando 0x{offset:x} = {value}')
+
+    ## @brief Reinicia o IP antes de voltar a usá-lo após uma falha
+    #
+    #  Reseta o PL (quando há reset) e escreve o start, que devolve a FSM ao início
+    #  do par de qualquer estado e descarta a palavra pendente. Levanta StallError
+    #  se a palavra pendente ou o overrun continuarem ativos.
+    #
+    def restart(self):
+
+        if self.reset is not None:
+            self.reset()
+
+        self.ip.write(start_addr, 1)
+
+        if self.packed:
+            self.waitFor(status_addr, 0, STATUS_WORD_VALID | STATUS_OVERRUN)
+
+    ## @brief Envia um par de frames ao IP e retorna o acumulador de movimento
+    #
+    def detect(self, frame1, frame2):
+
+        # Dá o start no IP
+        self.ip.write(start_addr, 1)
+
+        if self.packed:
+            self.sendPacked(frame1, frame2)
+        else:
+            self.sendPixels(frame1, frame2)
+
+        # Aguarda o resultado
+        self.waitFor(ready_addr, 1)
+
+        # Confere se alguma palavra foi sobrescrita antes de ser lida pela FSM
+        if self.packed and self.ip.read(status_addr) & STATUS_OVERRUN:
+            raise SendError('overrun: palavra de pixels sobrescrita antes da leitura')
+
+        self.am = self.ip.read(am_addr)
+        self.result = self.ip.read(result_addr)
+
+        return self.am
+
+    ## @brief Envia o par no modo empacotado (uma escrita por 4 pixels)
+    #
+    def sendPacked(self, frame1, frame2):
+
+        write = self.ip.write
+        words = packPair(frame1, frame2).tolist()
+
+        # Sem conferência: apenas escritas consecutivas em slv_reg2
+        if not self.check_every:
+            for word in words:
+                write(pixelValue_addr, word)
+            return
+
+        # Com conferência: a cada check_every palavras aguarda a FSM ler a pendente
+        for i in range(0, len(words), self.check_every):
+            for word in words[i:i + self.check_every]:
+                write(pixelValue_addr, word)
+            self.waitFor(status_addr, 0, STATUS_WORD_VALID)
+
+    ## @brief Envia o par no modo original (um pixel por vez, como no notebook)
+    #
+    def sendPixels(self, frame1, frame2):
+
+        pixels = np.concatenate((toGray(frame1).reshape(-1),
+                                 toGray(frame2).reshape(-1))).tolist()
+
+        for position, pixel in enumerate(pixels):
+
+            # Aguarda a FSM pedir o próximo pixel na posição esperada
+            self.waitFor(nextPixel_addr, 1)
+            self.waitFor(pixelPosition_addr, position % 16)
+
+            # Escreve o pixel e informa que ele está disponível
+            self.ip.write(pixelValue_addr, pixel)
+            self.ip.write(pixelAvailable_addr, 1)
+
+    ## @brief Verifica se houve movimento no último par processado
+    #
+    def verificaMovimento(self):
+
+        return self.result
+
+class HybridRunner():
+
+    ## @brief Instanciador da classe HybridRunner
+    #
+    #  Envia os pares ao IP e, por amostragem, também ao detector em software,
+    #  comparando os valores de am. Travamentos (StallError), erros de envio
+    #  (SendError) e divergências contam como falhas; após max_failures falhas
+    #  consecutivas, todos os pares passam a ir para o software, e o IP volta a ser
+    #  testado a cada retry_after pares: antes do par de teste o IP é reiniciado
+    #  (driver.restart), e o par de teste é sempre conferido.
+    #
+    def __init__(self,
+                 driver,
+                 software = None,
+                 sample_every = 10,
+                 max_failures = 3,
+                 retry_after = 100):
+
+        self.driver = driver
+        self.software = software if software is not None else IntegralMotionDetector()
+        self.sample_every = sample_every
+        self.max_failures = max_failures
+        self.retry_after = retry_after
+
+        print(f"HybridRunner:\n\
+        \tsample_every = {self.sample_every},\n\
+        \tmax_failures = {self.max_failures},\n\
+        \tretry_after = {self.retry_after}")
+
+        # Estado do fallback
+        self.use_hardware = True
+        self.failures = 0
+        self.pairs_in_software = 0
+
+        # Próximo par no IP é o teste após o fallback (conferido com o software)
+        self.probing = False
+
+        # Resultado do último par
+        self.am = 0
+        self.result = 0
+
+        # Estatísticas
+        self.stats = {'pairs': 0,
+                      'hardware_pairs': 0,
+                      'software_pairs': 0,
+                      'checks': 0,
+                      'mismatches': 0,
+                      'stalls': 0,
+                      'send_errors': 0,
+                      'failovers': 0}
+
+    ## @brief Processa um par de frames e retorna o acumulador de movimento
+    #
+    def detect(self, frame1, frame2):
+
+        self.stats['pairs'] += 1
+
+        # Em fallback, testa o IP novamente após retry_after pares
+        if not self.use_hardware:
+            self.pairs_in_software += 1
+            if self.pairs_in_software >= self.retry_after:
+                print('HybridRunner: testando o IP novamente')
+                self.use_hardware = True
+                self.failures = self.max_failures - 1
+                self.pairs_in_software = 0
+                self.probing = True
+
+        if self.use_hardware:
+            try:
+                # A falha pode ter deixado a FSM no meio de um par: reinicia o IP
+                # antes do par de teste
+                if self.probing:
+                    self.driver.restart()
+                return self.detectHardware(frame1, frame2)
+            except StallError as err:
+                self.stats['stalls'] += 1
+                self.fail(f'travamento do IP ({err})')
+            except SendError as err:
+                self.stats['send_errors'] += 1
+                self.fail(f'erro de envio ({err})')
+
+        return self.detectSoftware(frame1, frame2)
+
+    ## @brief Processa o par no IP, conferindo por amostragem com o software
+    #
+    #  Quando o resultado do IP diverge do software, retorna o do software.
+    #
+    def detectHardware(self, frame1, frame2):
+
+        am = self.driver.detect(frame1, frame2)
+
+        # Confere o par amostrado (e o par de teste após o fallback) com o software
+        sampled = self.sample_every and self.stats['hardware_pairs'] % self.sample_every == 0
+
+        if self.probing or sampled:
+
+            self.probing = False
+
+            self.stats['checks'] += 1
+            am_software = self.software.detect(frame1, frame2)
+
+            if am_software != am:
+                self.stats['mismatches'] += 1
+                self.fail(f'divergência de am (IP = {am}, software = {am_software})')
+                self.stats['software_pairs'] += 1
+                self.am = am_software
+                self.result = self.software.verificaMovimento()
+                return self.am
+
+        self.stats['hardware_pairs'] += 1
+        self.failures = 0
+        self.am = am
+        self.result = self.driver.verificaMovimento()
+
+        return self.am
+
+    ## @brief Processa o par no software
+    #
+    def detectSoftware(self, frame1, frame2):
+
+        self.stats['software_pairs'] += 1
+        self.am = self.software.detect(frame1, frame2)
+        self.result = self.software.verificaMovimento()
+
+        return self.am
+
+    ## @brief Contabiliza uma falha do IP e ativa o fallback se necessário
+    #
+    def fail(self, reason):
+
+        self.failures += 1
+        print(f'HybridRunner: {reason}, falhas = {self.failures}')
+
+        if self.use_hardware and self.failures >= self.max_failures:
+            print('HybridRunner: usando o detector em software')
+            self.use_hardware = False
+            self.pairs_in_software = 0
+            self.probing = False
+            self.stats['failovers'] += 1
+
+    ## @brief Verifica se houve movimento no último par processado
+    #
+    def verificaMovimento(self):
+
+        return self.result
+
+class SimulatedMotionDetectorIP():
+
+    ## @brief Instanciador da classe SimulatedMotionDetectorIP
+    #
+    #  Modelo em nível de transação do IP: a FSM é considerada mais rápida que o
+    #  barramento, então cada palavra escrita é lida antes da próxima escrita.
+    #
+    def __init__(self,
+                 pixels_per_word = 4,
+                 resolution = [640, 480],
+                 threshold = 15):
+
+        self.pixels_per_word = pixels_per_word
+        self.width, self.height = resolution
+        self.thresh = threshold
+
+        # Buffer com os pixels do par de frames recebido
+        self.pixels = np.zeros(2 * self.width * self.height, dtype=np.uint8)
+
+        # Injeção de falhas: stall nunca levanta ready, stall_midpair trava a FSM na
+        # metade do par (até o próximo start) e am_offset corrompe o am
+        self.stall = False
+        self.stall_midpair = False
+        self.am_offset = 0
+
+        # Estado da FSM simulada
+        self.started = False
+        self.position = 0
+        self.value = 0
+        self.am = 0
+        self.ready = 0
+        self.result = 0
+        self.overrun = 0
+        self.word_valid = 0
+        self.hung = False
+
+    ## @brief Leitura de um registrador
+    #
+    def read(self, offset):
+
+        if offset == start_addr:
+            return 0
+        elif offset == pixelValue_addr:
+            return self.value
+        elif offset == nextPixel_addr:
+            return int(self.started and not self.ready and not self.hung)
+        elif offset == pixelPosition_addr:
+            return self.position % 16
+        elif offset == am_addr:
+            return self.am
+        elif offset == ready_addr:
+            return self.ready
+        elif offset == result_addr:
+            return self.result
+        elif offset == status_addr:
+            return int(self.pixels_per_word > 1) | (self.overrun << 1) | (self.word_valid << 2)
+        else:
+            return 0
+
+    ## @brief Escrita em um registrador
+    #
+    def write(self, offset, value):
+
+        # Start: como no RTL, reinicia a FSM de qualquer estado (contadores, am e
+        # flags zerados) e descarta a palavra pendente, começando um novo par
+        if offset == start_addr:
+            self.started = True
+            self.position = 0
+            self.am = 0
+            self.ready = 0
+            self.result = 0
+            self.overrun = 0
+            self.word_valid = 0
+            self.hung = False
+
+        # pixelValue: no modo empacotado, a escrita já entrega os pixels
+        elif offset == pixelValue_addr:
+            self.value = value & (2**(8 * self.pixels_per_word) - 1)
+            if self.pixels_per_word > 1:
+                self.consume(self.value)
+
+        # pixelAvailable: apenas no modo original
+        elif offset == pixelAvailable_addr:
+            if self.pixels_per_word == 1:
+                self.consume(self.value)
+
+    ## @brief Acumula os pixels de uma palavra, como o estado accumulator da FSM
+    #
+    def consume(self, word):
+
+        if not self.started or self.ready:
+            return
+
+        # FSM travada: a palavra fica pendente e a seguinte a sobrescreve
+        if self.hung:
+            if self.pixels_per_word > 1:
+                self.overrun |= self.word_valid
+                self.word_valid = 1
+            return
+
+        for k in range(self.pixels_per_word):
+            self.pixels[self.position + k] = (word >> 8*k) & 0xFF
+
+        self.position += self.pixels_per_word
+
+        # Falha injetada: a FSM para na metade do par
+        if self.stall_midpair and self.position == self.pixels.size // 2:
+            self.hung = True
+
+        # Com o par completo, calcula o resultado
+        if self.position == self.pixels.size:
+            self.compute()
+
+    ## @brief Calcula am e result com a mesma aritmética inteira da FSM
+    #
+    def compute(self):
+
+        frames = self.pixels.reshape(2, self.height // 16, 16, self.width // 16, 16)
+
+        # Soma dos chunks seguida do shift right (>> 8)
+        means = frames.sum(axis=(2, 4), dtype=np.int32) >> 8
+
+        self.am = int(np.count_nonzero(np.abs(means[0] - means[1]) > self.thresh)) + self.am_offset
+        self.result = int(self.am >= 300)
+        self.ready = int(not self.stall)
+        self.started = False
+
+if __name__ == "__main__":
+
+    # Recebendo os argumentos
+    import argparse
+    from cv2 import VideoCapture
+    from integralDetector import IntegralMotionDetector
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-pth", "--capture_path", required=True,
+    help="Vídeo usado para verificar o driver contra o IP simulado")
+    ap.add_argument("-n", "--pairs", required=False, type=int, default=10,
+    help="Quantidade máxima de pares de frames")
+    ap.add_argument("-ppw", "--pixels_per_word", required=False, type=int, default=4, choices=[1, 4],
+    help="Modo do IP simulado (1: original, 4: empacotado)")
+    args = vars(ap.parse_args())
+
+    driver = MotionDetectorDriver(SimulatedMotionDetectorIP(args["pixels_per_word"]))
+    reference = IntegralMotionDetector()
+
+    cap = VideoCapture(args["capture_path"])
+
+    for i in range(args["pairs"]):
+
+        ret1, frame1 = cap.read()
+        ret2, frame2 = cap.read()
+        if not (ret1 and ret2):
+            break
+
+        start = perf_counter()
+        am = driver.detect(frame1, frame2)
+        elapsed = perf_counter() - start
+
+        am_ref = reference.detect(frame1, frame2)
+        print(f'par = {i}, am = {am}, am_ref = {am_ref}, ok = {am == am_ref}, t = {elapsed:.3f}s')
+
+    cap.release()
@@ -0,0 +1,147 @@
+##
+# @file frameGovernor.py
+# @brief Governador da taxa de amostragem do FrameCapture de acordo com a carga
+#
+#  Em vez de um fps_percent fixo, cada câmera tem um governador que ajusta a
+#  porcentagem de frames amostrados em tempo de execução: sobe ao detectar movimento
+#  e desce até o piso quando a cena está parada ou quando a latência da detecção
+#  passa do orçamento. A porcentagem é fracionária (o FrameCapture acumula a parte
+#  fracionária da razão de decimação). Um GovernorPool opcional limita a soma dos
+#  frames por segundo de todas as câmeras a um orçamento total.
+#
+
+from threading import Lock
+
+class FrameRateGovernor():
+
+    ## @brief Instanciador da classe FrameRateGovernor
+    #
+    #  source_fps: velocidade de captura configurada na fonte
+    #  fps_percent: porcentagem inicial
+    #  floor_percent / max_percent: limites da porcentagem
+    #  latency_budget: latência máxima, em segundos, de um par na detecção
+    #  idle_pairs: pares sem movimento antes de começar a reduzir a taxa
+    #  ramp_up / ramp_down: fatores multiplicativos de subida e descida
+    #
+    def __init__(self,
+                 source_fps,
+                 fps_percent = 40,
+                 floor_percent = 10,
+                 max_percent = 100,
+                 latency_budget = 0.5,
+                 idle_pairs = 10,
+                 ramp_up = 2.0,
+                 ramp_down = 0.8,
+                 pool = None):
+
+        if not 0 < floor_percent <= max_percent <= 100:
+            raise ValueError('é necessário 0 < floor_percent <= max_percent <= 100')
+
+        self.source_fps = source_fps
+        self.floor_percent = floor_percent
+        self.max_percent = max_percent
+        self.latency_budget = latency_budget
+        self.idle_pairs = idle_pairs
+        self.ramp_up = ramp_up
+        self.ramp_down = ramp_down
+
+        # Porcentagem desejada pelo governador e porcentagem efetiva (após o pool)
+        self.desired_percent = min(max(fps_percent, floor_percent), max_percent)
+        self.percent = self.desired_percent
+
+        # Pares consecutivos sem movimento
+        self.idle = 0
+
+        print(f"FrameRateGovernor:\n\
+        \tfps_percent = {self.percent},\n\
+        \tfloor_percent = {self.floor_percent},\n\
+        \tmax_percent = {self.max_percent},\n\
+        \tlatency_budget = {self.latency_budget}")
+
+        # Registra o governador no pool, se houver
+        self.pool = pool
+        if self.pool is not None:
+            self.pool.register(self)
+
+    ## @brief Atualiza a taxa com o resultado e a latência de um par
+    #
+    def update(self, motion, latency = 0.0):
+
+        # Detecção atrasada: reduz a taxa imediatamente, mesmo com movimento, para
+        # manter o uso de CPU limitado
+        if latency > self.latency_budget:
+            self.idle = 0 if motion else self.idle + 1
+            percent = self.desired_percent * self.ramp_down
+
+        # Movimento: sobe a taxa para acompanhar a cena
+        elif motion:
+            self.idle = 0
+            percent = self.desired_percent * self.ramp_up
+
+        # Cena parada há idle_pairs pares: reduz a taxa em direção ao piso
+        else:
+            self.idle += 1
+            if self.idle >= self.idle_pairs:
+                percent = self.desired_percent * self.ramp_down
+            else:
+                percent = self.desired_percent
+
+        self.desired_percent = min(max(percent, self.floor_percent), self.max_percent)
+
+        # Aplica o orçamento global de frames por segundo
+        if self.pool is not None:
+            self.pool.rebalance()
+        else:
+            self.percent = self.desired_percent
+
+        return self.percent
+
+    ## @brief Frames por segundo efetivamente amostrados
+    #
+    def fps(self):
+
+        return self.source_fps * self.percent / 100
+
+class GovernorPool():
+
+    ## @brief Instanciador da classe GovernorPool
+    #
+    #  fps_budget: soma máxima dos frames por segundo amostrados por todas as câmeras
+    #
+    def __init__(self, fps_budget):
+
+        self.fps_budget = fps_budget
+        self.governors = []
+        self.lock = Lock()
+
+        print(f'GovernorPool: fps_budget = {self.fps_budget}')
+
+    ## @brief Registra o governador de uma câmera
+    #
+    def register(self, governor):
+
+        with self.lock:
+            self.governors.append(governor)
+
+        self.rebalance()
+
+    ## @brief Distribui o orçamento entre as câmeras
+    #
+    #  Se a soma das taxas desejadas cabe no orçamento, todas são atendidas; se não,
+    #  todas são reduzidas na mesma proporção, respeitando o piso de cada câmera.
+    #
+    def rebalance(self):
+
+        with self.lock:
+
+            desired = sum(g.source_fps * g.desired_percent / 100 for g in self.governors)
+            factor = min(1.0, self.fps_budget / desired) if desired > 0 else 1.0
+
+            for g in self.governors:
+                g.percent = max(g.desired_percent * factor, g.floor_percent)
+
+    ## @brief Frames por segundo amostrados por todas as câmeras
+    #
+    def fps(self):
+
+        return sum(g.fps() for g in self.governors)
@@ -7,15 +7,34 @@
 #  Diagrama de bloco da FSM: https://github.com/leobbf/MotionDetector/blob/main/TCC_FSM_Completa.pdf
 #
 
-from re import L
-from cv2 import (VideoCapture, VideoWriter_fourcc, imshow, waitKey, 
-                 blur, INTER_AREA, COLOR_BGR2GRAY, cvtColor, absdiff, 
-                 GaussianBlur, threshold, destroyAllWindows) 
+from cv2 import (VideoCapture, COLOR_BGR2GRAY, cvtColor,
+                 CAP_PROP_CONVERT_RGB, CAP_PROP_FOURCC, CAP_ANY,
+                 CAP_PROP_OPEN_TIMEOUT_MSEC, CAP_PROP_READ_TIMEOUT_MSEC) 
 import numpy as np
 from exception import CaptureError, Motion, NoMotion
 from queue import Queue, Full, Empty
 from threading import Thread, Event
-from time import sleep
+from time import sleep, monotonic, time
+
+## @brief Apresenta um frame na tela
+#
+#  A interface gráfica do OpenCV só é importada quando a apresentação é usada, para
+#  não pesar na inicialização dos processos sem tela (lotes, servidores).
+#
+def showFrame(name, frame, delay = 100):
+
+    from cv2 import imshow, waitKey
+
+    imshow(name, frame)
+    waitKey(delay)
+
+## @brief Fecha as janelas abertas pelo showFrame
+#
+def closeWindows():
+
+    from cv2 import destroyAllWindows
+
+    destroyAllWindows()
 
 class FrameCapture():
 
@@ -28,7 +47,11 @@ class FrameCapture():
                  fps,
                  fps_percent,
                  resolution,
-                 event_time):
+                 event_time,
+                 gray = False,
+                 governor = None,
+                 display = False,
+                 timestamps = False):
 
         # Define os parametros de captura
         self.path = capture_path
@@ -36,6 +59,17 @@ class FrameCapture():
         self.fps_percent = fps_percent
         self.source_resolution = resolution
         self.event_time = event_time #segundos
+        self.gray = gray
+        self.display = display
+
+        # Enfileira tuplas (frame, instante de captura) em vez de apenas o frame
+        self.timestamps = timestamps
+        self.frame_time = None
+
+        # Governador da taxa de amostragem (opcional) e crédito de frames para
+        # decimação fracionária
+        self.governor = governor
+        self.grab_credit = 0.0
 
         # Apresenta os parâmetros na tela
         print(f"FrameCapture:\n\
@@ -43,14 +77,17 @@ class FrameCapture():
         \tsource_fps = {self.source_fps},\n\
         \tresolution = {self.source_resolution},\n\
         \treal_fps = {self.source_fps*fps_percent/100}\n\
-        \tevent_time = {self.event_time}")
+        \tevent_time = {self.event_time}\n\
+        \tgray = {self.gray},\n\
+        \tdisplay = {self.display}")
 
         # Tratando o caminho de captura pra webcam
         if self.path == '0':
             self.path = 0
 
-        # Instancia um objeto de captura de vídeo (via OpenCV)
-        self.cap = VideoCapture(self.path)
+        # O objeto de captura de vídeo só é aberto no start()
+        self.cap = None
+        self.luma_channel = None
 
         # Coloca como self a fila de saída
         self.fifo = fifo_out
@@ -66,10 +103,24 @@ class FrameCapture():
         # Instancia um controlador de eventos para thread de captura
         self.ready = Event()
 
+    ## @brief Método para abrir a fonte de captura
+    #
+    def open(self):
+
+        # Instancia um objeto de captura de vídeo (via OpenCV)
+        self.cap = VideoCapture(self.path)
+
+        # Solicita à fonte apenas o plano de luminância, quando suportado
+        self.luma_channel = self.requestLuma() if self.gray else None
+
     ## @brief Método para inicializar as operações da classe
     #
     def start(self):
 
+        # Abre a fonte de captura na primeira inicialização
+        if self.cap is None:
+            self.open()
+
         # Verifica se a thread está pausada
         if self.should_continue and not self.ready.isSet():
 
@@ -111,10 +162,11 @@ class FrameCapture():
     #
     def free(self):
 
-        # Se a classe estiver parada
-        if not self.should_continue:
+        # Se a classe estiver parada (e a fonte tiver sido aberta)
+        if not self.should_continue and self.cap is not None:
             # Libera o objeto VideoCapture
             self.cap.release()
+            self.cap = None
 
             print("free: Liberando o objeto VideoCapture ")
 
@@ -144,7 +196,7 @@ class FrameCapture():
                 #print("run: capture")
 
                 # Coloca o frame capturado na fila 
-                self.fifo.put(frame)
+                self.enqueue(frame)
                 #print('run: fifo.put(frame)')
 
             # Se um erro de captura levantado
@@ -161,6 +213,86 @@ class FrameCapture():
                 
                 self.ready.clear()
 
+    ## @brief Método para enfileirar um frame capturado
+    #
+    def enqueue(self, frame):
+
+        if self.timestamps:
+            self.fifo.put((frame, self.frame_time))
+        else:
+            self.fifo.put(frame)
+
+    ## @brief Método para solicitar à fonte frames apenas com a luminância
+    #
+    #  Para câmeras com formato YUV (ou já em escala de cinza), desliga a conversão
+    #  para BGR do backend e retorna o canal do plano Y no frame bruto.
+    #  Retorna None quando não suportado, e a conversão é feita na thread de captura.
+    #
+    def requestLuma(self):
+
+        # Arquivos de vídeo são sempre decodificados em BGR
+        if not isinstance(self.path, int) and self.path.find(".mp4") != -1:
+            return None
+
+        # Decodifica o formato de pixel da fonte
+        fourcc = int(self.cap.get(CAP_PROP_FOURCC))
+        fourcc = ''.join(chr((fourcc >> 8*i) & 0xFF) for i in range(4))
+
+        # Posição do Y no frame bruto para cada formato suportado
+        channels = {'YUYV': 0, 'YUY2': 0, 'UYVY': 1, 'GREY': 0, 'Y800': 0}
+
+        if fourcc not in channels:
+            print(f'requestLuma: formato {fourcc} sem suporte, convertendo na captura')
+            return None
+
+        # Desliga a conversão para BGR no backend
+        if not self.cap.set(CAP_PROP_CONVERT_RGB, 0):
+            print('requestLuma: backend não permite desligar a conversão para BGR')
+            return None
+
+        print(f'requestLuma: capturando apenas a luminância ({fourcc})')
+
+        return channels[fourcc]
+
+    ## @brief Método para deixar o frame capturado em escala de cinza
+    #
+    def toGray(self, frame):
+
+        # Frame bruto do backend (conversão para BGR desligada)
+        if self.luma_channel is not None:
+
+            width, height = self.source_resolution
+
+            # Alguns backends entregam o buffer bruto em uma única linha
+            if frame.ndim == 2 and frame.size == width*height*2:
+                frame = frame.reshape(height, width, 2)
+
+            # Formatos YUV 4:2:2 intercalados: o Y ocupa um dos dois bytes
+            if frame.ndim == 3 and frame.shape[2] == 2:
+                return np.ascontiguousarray(frame[:, :, self.luma_channel])
+
+            # Fontes que já entregam escala de cinza
+            if frame.ndim == 2 and frame.size == width*height:
+                return frame.reshape(height, width)
+
+            # Formato inesperado: volta a pedir BGR ao backend
+            print(f'toGray: frame bruto {frame.shape} inesperado, religando a conversão para BGR')
+            self.cap.set(CAP_PROP_CONVERT_RGB, 1)
+            self.luma_channel = None
+
+            # e captura um novo frame já em BGR
+            ret, frame = self.cap.read()
+
+            if not ret:
+                raise CaptureError('read error (gray)')
+
+        # Frames já em escala de cinza
+        if frame.ndim == 2:
+            return frame
+
+        # Conversão única, feita na thread de captura
+        return cvtColor(frame, COLOR_BGR2GRAY)
+
     ## @brief Método para capturar um frame
     #
     def capture(self):
@@ -185,8 +317,14 @@ class FrameCapture():
         # Para o caso de apontar para um streamer (Câmera ou webcam)
         else:
 
-            # Agarra os frames espaçados de acordo com o fps_percent
-            for j in range(int(100/self.fps_percent)):
+            # Agarra os frames espaçados de acordo com o fps_percent (ou com o
+            # governador), acumulando a parte fracionária da razão entre capturas
+            percent = self.governor.percent if self.governor is not None else self.fps_percent
+            self.grab_credit += 100/percent
+            grabs = max(1, int(self.grab_credit))
+            self.grab_credit -= grabs
+
+            for j in range(grabs):
                 ret = self.cap.grab()
 
                 if not ret:
@@ -198,14 +336,279 @@ class FrameCapture():
             if not ret:
                 raise CaptureError('retrieve error')
 
-        # Apresenta o frame capturado na tela
-        imshow('frame', frame)
-        waitKey(100)
+        # Instante de captura do frame (antes da espera na fila)
+        self.frame_time = time()
+
+        # Deixa o frame em escala de cinza antes de enfileirar
+        if self.gray:
+            frame = self.toGray(frame)
+
+        # Apresenta o frame na tela, se solicitado, já convertido (com a luminância
+        # pedida à fonte, o frame bruto não é uma imagem BGR)
+        if self.display:
+            showFrame('frame', frame)
 
         # retorna o frame capturado
         return frame
 
-    
+
+class SupervisedFrameCapture(FrameCapture):
+
+    ## @brief Instanciador da classe SupervisedFrameCapture
+    #
+    #  Captura supervisionada para fontes ao vivo (RTSP, câmeras): em vez de pausar a
+    #  thread no primeiro CaptureError, reabre o VideoCapture com backoff exponencial.
+    #  Um watchdog acompanha o tempo desde o último frame e pede a reconexão quando a
+    #  fonte trava. A fila de saída (e o detector) não são afetados pela reconexão.
+    #
+    def __init__(self,
+                 capture_path,
+                 fifo_out,
+                 fps,
+                 fps_percent,
+                 resolution,
+                 event_time,
+                 gray = False,
+                 governor = None,
+                 display = False,
+                 timestamps = False,
+                 stall_timeout = 5.0,
+                 backoff_min = 0.5,
+                 backoff_max = 30.0):
+
+        super().__init__(capture_path, fifo_out, fps, fps_percent,
+                         resolution, event_time, gray, governor, display,
+                         timestamps)
+
+        # Parametros da supervisão (segundos)
+        self.stall_timeout = stall_timeout
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+
+        print(f"SupervisedFrameCapture:\n\
+        \tstall_timeout = {self.stall_timeout},\n\
+        \tbackoff_min = {self.backoff_min},\n\
+        \tbackoff_max = {self.backoff_max}")
+
+        # Evento para interromper as esperas do backoff e do watchdog
+        self.wake = Event()
+
+        # Pedido de reconexão feito pelo watchdog
+        self.reconnect_requested = Event()
+
+        # Espera atual do backoff: só volta ao mínimo depois que um frame é entregue
+        self.backoff = self.backoff_min
+
+        # Contadores da supervisão (conectado = entregando frames)
+        self.frames = 0
+        self.reconnects = 0
+        self.opened = False
+        self.connected_since = None
+        self.uptime_total = 0.0
+        self.last_frame = monotonic()
+
+        # Indica que a thread está dentro do capture() (e não esperando a fila),
+        # e desde quando
+        self.capturing = False
+        self.capture_started = monotonic()
+
+        # Instancia a thread do watchdog
+        self.watchdog_thread = Thread(target = self.watchdog,
+                                      name = 'watchdogThread',
+                                      daemon=True)
+
+    ## @brief Verifica se a fonte é um arquivo de vídeo (que não é reaberto)
+    #
+    def isFile(self):
+
+        return not isinstance(self.path, int) and self.path.find(".mp4") != -1
+
+    ## @brief Cria o VideoCapture com tempo limite de abertura e de leitura
+    #
+    #  Os limites evitam que um grab() travado segure a thread além do stall_timeout.
+    #
+    def openCapture(self):
+
+        return VideoCapture(self.path, CAP_ANY,
+                            [CAP_PROP_OPEN_TIMEOUT_MSEC, int(self.stall_timeout * 1000),
+                             CAP_PROP_READ_TIMEOUT_MSEC, int(self.stall_timeout * 1000)])
+
+    ## @brief Método para abrir a fonte de captura
+    #
+    def open(self):
+
+        self.cap = self.openCapture()
+
+        # Solicita à fonte apenas o plano de luminância, quando suportado
+        self.luma_channel = self.requestLuma() if self.gray else None
+
+        # O tempo conectado só começa a contar no primeiro frame (run)
+        self.opened = self.cap.isOpened()
+
+    ## @brief Método para inicializar as operações da classe
+    #
+    def start(self):
+
+        # Na primeira inicialização, inicia também o watchdog
+        first_start = not self.should_continue and not self.capture_thread.is_alive()
+
+        super().start()
+
+        if first_start:
+            self.last_frame = monotonic()
+            self.watchdog_thread.start()
+
+    ## Método de parada das operações da classe
+    #
+    def stop(self):
+
+        super().stop()
+
+        # Libera as esperas do backoff e do watchdog
+        self.wake.set()
+
+    ## @brief Estatísticas da captura supervisionada
+    #
+    def stats(self):
+
+        now = monotonic()
+        uptime = self.uptime_total
+
+        if self.connected_since is not None:
+            uptime += now - self.connected_since
+
+        return {'connected': self.connected_since is not None,
+                'uptime': uptime,
+                'frames': self.frames,
+                'reconnects': self.reconnects,
+                'time_since_last_frame': now - self.last_frame}
+
+    ## @brief Rotina do watchdog: pede a reconexão se a fonte parar de entregar frames
+    #
+    #  Só conta como travamento o tempo gasto dentro do capture(): a thread bloqueada
+    #  na fila cheia (consumidor lento) não indica problema na fonte.
+    #
+    def watchdog(self):
+
+        while not self.wake.wait(timeout = self.stall_timeout / 2):
+
+            # Só supervisiona enquanto a captura estiver ativa, aberta e capturando
+            if not self.ready.is_set() or not self.opened or not self.capturing:
+                continue
+
+            # Arquivos de vídeo não são reabertos
+            if self.isFile():
+                continue
+
+            if monotonic() - self.capture_started > self.stall_timeout and not self.reconnect_requested.is_set():
+                print(f'watchdog: sem frames há mais de {self.stall_timeout}s, pedindo reconexão')
+                self.reconnect_requested.set()
+
+    ## @brief Reabre o VideoCapture com backoff exponencial
+    #
+    #  Toda tentativa espera o backoff antes de reabrir, e o backoff só volta ao
+    #  mínimo quando um frame é entregue: uma fonte que abre mas falha na leitura
+    #  também tem as tentativas espaçadas.
+    #
+    def reconnect(self):
+
+        # Contabiliza o tempo conectado até aqui
+        if self.connected_since is not None:
+            self.uptime_total += monotonic() - self.connected_since
+            self.connected_since = None
+
+        self.cap.release()
+        self.opened = False
+
+        while self.should_continue:
+
+            # Espera o backoff (interrompido pelo stop) e dobra o tempo
+            print(f'reconnect: aguardando {self.backoff}s')
+            self.wake.wait(timeout = self.backoff)
+            self.backoff = min(2 * self.backoff, self.backoff_max)
+
+            if not self.should_continue:
+                break
+
+            print(f'reconnect: reabrindo {self.path} (tentativa {self.reconnects + 1})')
+            self.reconnects += 1
+
+            # Limita o tempo de abertura e de leitura para não travar a thread
+            self.cap = self.openCapture()
+
+            if self.cap.isOpened():
+
+                # Solicita de novo a luminância à fonte reaberta
+                if self.gray:
+                    self.luma_channel = self.requestLuma()
+
+                self.opened = True
+                self.reconnect_requested.clear()
+                print('reconnect: fonte reaberta')
+                return
+
+    ## @brief Rotina para a thread de captura e enfileiramento de frames
+    #
+    def run(self):
+
+        print("Iniciando a thread de captura supervisionada ...")
+
+        # Laço principal de captura
+        while True:
+
+            # Aguarda a autorização
+            self.ready.wait()
+
+            # Verifica a flag de continuidade
+            if not self.should_continue:
+                print('A thread de captura supervisionada não deve continuar !')
+                break
+
+            # Reconecta se o watchdog pediu (arquivos de vídeo não são reabertos)
+            if self.reconnect_requested.is_set():
+                if self.isFile():
+                    self.reconnect_requested.clear()
+                else:
+                    self.reconnect()
+                    continue
+
+            try:
+
+                # Captura o frame e atualiza a supervisão
+                self.capture_started = monotonic()
+                self.capturing = True
+                try:
+                    frame = self.capture()
+                finally:
+                    self.capturing = False
+                self.frames += 1
+                self.last_frame = monotonic()
+
+                # Um frame entregue confirma a conexão: começa a contar o tempo
+                # conectado e o backoff volta ao mínimo
+                if self.connected_since is None:
+                    self.connected_since = self.last_frame
+                self.backoff = self.backoff_min
+
+                # Coloca o frame capturado na fila
+                self.enqueue(frame)
+
+            # Se um erro de captura levantado, reconecta em vez de pausar
+            except CaptureError as err:
+                print(f'run: {err}')
+
+                # Arquivos de vídeo não são reabertos (fim do arquivo)
+                if self.isFile():
+                    self.ready.clear()
+                else:
+                    self.reconnect()
+
+            # Se a fila estiver cheia
+            except Full as err:
+                print(f'run: {err}, qsize = {self.fifo.qsize()}')
+                self.ready.clear()
+
+
 class MotionDetector():
 
     ## @brief Instanciador da classe MotionDetector
@@ -267,6 +670,14 @@ class MotionDetector():
         # Vetor de Movimento
         self.vm = np.zeros(self.chunk_columns, dtype=int)
         print(f'Vetor de Movimento = VM{self.vm.shape}')
+
+        # Médias dos chunks dos dois frames do par (assinaturas dos frames)
+        self.means = np.zeros((2, self.chunk_lines, self.chunk_columns), dtype=np.uint8)
+        print(f'Médias dos frames = MEANS{self.means.shape}')
+
+        # Máscara de movimento dos chunks (as 30 linhas do VM do par atual)
+        self.mask = np.zeros((self.chunk_lines, self.chunk_columns), dtype=np.uint8)
+        print(f'Máscara de Movimento = MASK{self.mask.shape}')
      
     def pegaPixel(self, I):
 
@@ -310,6 +721,9 @@ class MotionDetector():
 
     def alocaMedias(self):
 
+        # Guarda as médias do primeiro frame
+        self.means[0][self.lc] = self.reg
+
         # para cada posição do registrador
         for i in range(len(self.reg)):
             # aloca a média na matriz de chunks
@@ -322,6 +736,9 @@ class MotionDetector():
 
     def mediasDiff(self):
 
+        # Guarda as médias do segundo frame
+        self.means[1][self.l] = self.reg
+
         # para cada posição do registrador
         for i in range(len(self.reg)):
 
@@ -357,6 +774,9 @@ class MotionDetector():
                 # Recebe 0
                 self.vm[i] = 0
 
+        # Guarda a linha do vetor de movimento na máscara de chunks
+        self.mask[self.l] = self.vm
+
         # O contador de colunas da matriz de chunks é iterado
         self.l += 1
 
@@ -395,18 +815,103 @@ class MotionDetector():
         self.reg = np.zeros(self.chunk_columns, dtype=np.uint16)
         self.mc = np.zeros((self.chunk_lines, self.chunk_columns), dtype=int)
         self.vm = np.zeros(self.chunk_columns, dtype=np.uint16)
+        self.mask[:] = 0
+
+class MotionSmoother():
+
+    ## @brief Instanciador da classe MotionSmoother
+    #
+    #  Suaviza as decisões do MotionDetector com histerese nos limiares de am
+    #  e tempos mínimos de permanência (em decisões consecutivas). A cada
+    #  mudança de estado é levantado o evento Motion ou NoMotion.
+    #
+    def __init__(self,
+                 on_threshold = 300,
+                 off_threshold = 250,
+                 min_on = 2,
+                 min_off = 5):
+
+        # O limiar de desligamento não pode ser maior que o de ligamento
+        if off_threshold > on_threshold:
+            raise ValueError('off_threshold deve ser menor ou igual a on_threshold')
+
+        # Define os parametros de suavização
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+        self.min_on = max(1, min_on)
+        self.min_off = max(1, min_off)
+
+        print(f"MotionSmoother:\n\
+        \ton_threshold = {self.on_threshold},\n\
+        \toff_threshold = {self.off_threshold},\n\
+        \tmin_on = {self.min_on},\n\
+        \tmin_off = {self.min_off}")
+
+        # Estado suavizado atual (0: sem movimento, 1: movimento)
+        self.state = 0
+
+        # Contador de decisões consecutivas a favor da troca de estado
+        self.count = 0
+
+    ## @brief Atualiza o estado suavizado com o am de um novo par de frames
+    #
+    #  Custo O(1) por decisão. Levanta Motion ou NoMotion quando o estado muda,
+    #  caso contrário retorna o estado atual.
+    #
+    def update(self, am):
+
+        # Verifica se o am atual favorece a troca de estado
+        if self.state == 0:
+            favorece = am >= self.on_threshold
+            minimo = self.min_on
+        else:
+            favorece = am < self.off_threshold
+            minimo = self.min_off
+
+        # Se não favorece, zera o contador de permanência
+        if not favorece:
+            self.count = 0
+            return self.state
+
+        # Se favorece, itera o contador
+        self.count += 1
+
+        # Enquanto não atingir o tempo mínimo, mantém o estado
+        if self.count < minimo:
+            return self.state
+
+        # Troca o estado e levanta o evento correspondente
+        self.state = 1 - self.state
+        self.count = 0
+
+        if self.state == 1:
+            raise Motion(f'am = {am}')
+        else:
+            raise NoMotion(f'am = {am}')
+
+    ## @brief Retorna o suavizador ao estado sem movimento
+    #
+    def reset(self):
+
+        self.state = 0
+        self.count = 0
 
 ## @brief Função para concatenar dois frames em escala de cinza
 #
-def concatenateGrayPair(frame1, frame2):
+#  plan: PreprocessPlan opcional (preprocess.py) com os estágios de pré-processamento
+#
+def concatenateGrayPair(frame1, frame2, plan = None):
 
-        # Coloca os frames em escala de cinza
-        frame1 = cvtColor(frame1, COLOR_BGR2GRAY)
-        frame2 = cvtColor(frame2, COLOR_BGR2GRAY)
+        # Aplica o plano de pré-processamento (inclui a conversão para escala de cinza)
+        if plan is not None:
+            frame1 = plan.run(frame1, 0)
+            frame2 = plan.run(frame2, 1)
 
-        # Aplica um embaçamento nos frames
-        #frame1 = blur(frame1, (5, 5))
-        #frame2 = blur(frame2, (5, 5))
+        # Coloca os frames em escala de cinza (se a captura ainda não o fez)
+        if frame1.ndim == 3:
+            frame1 = cvtColor(frame1, COLOR_BGR2GRAY)
+        if frame2.ndim == 3:
+            frame2 = cvtColor(frame2, COLOR_BGR2GRAY)
 
         frame1 = np.concatenate(frame1)
         frame2 = np.concatenate(frame2)
@@ -426,12 +931,38 @@ if __name__ == "__main__":
     help="Caminho para a fonte de captura")
     ap.add_argument("-fps", "--source_fps", required=False, type=int, default=15,
     help="Velocidade de captura configurado na fonte, em frames por segundo")
-    ap.add_argument("-fps_percent", "--fps_percent", required=False, type=int, default=40,
+    ap.add_argument("-fps_percent", "--fps_percent", required=False, type=float, default=40,
     help="Porcentagem do FPS da fonte utilizada pelo FrameProducer (valor entre 0 e 100)")
     ap.add_argument("-rsl", "--source_resolution", required=False, type=int, nargs="+", default=[640, 480],
     help="Resolução dos frames configurada na fonte (Largura Altura) ")
     ap.add_argument("-event_length", "--event_length", required=False, type=int, default=3,
     help="Tempo de captura dos eventos, em segundo")
+    ap.add_argument("-am_on", "--am_on", required=False, type=int, default=300,
+    help="Valor de am a partir do qual o suavizador considera movimento")
+    ap.add_argument("-am_off", "--am_off", required=False, type=int, default=250,
+    help="Valor de am abaixo do qual o suavizador considera ausência de movimento")
+    ap.add_argument("-min_on", "--min_on", required=False, type=int, default=2,
+    help="Quantidade de decisões consecutivas para sinalizar Motion")
+    ap.add_argument("-min_off", "--min_off", required=False, type=int, default=5,
+    help="Quantidade de decisões consecutivas para sinalizar NoMotion")
+    ap.add_argument("-mode", "--mode", required=False, default="fsm", choices=["fsm", "integral", "area"],
+    help="Modo de detecção: FSM pixel a pixel, imagem integral (exato) ou INTER_AREA (aproximado)")
+    ap.add_argument("-supervised", "--supervised", required=False, action="store_true",
+    help="Reconecta automaticamente a fonte ao vivo em caso de erro ou travamento")
+    ap.add_argument("-index", "--index", required=False, default=None,
+    help="Caminho base do índice de assinaturas dos frames (desligado se omitido)")
+    ap.add_argument("-governor", "--governor", required=False, action="store_true",
+    help="Ajusta o fps_percent em tempo de execução de acordo com o movimento e a latência")
+    ap.add_argument("-fps_floor", "--fps_floor", required=False, type=float, default=10,
+    help="Porcentagem mínima do FPS da fonte utilizada pelo governador")
+    ap.add_argument("-latency_budget", "--latency_budget", required=False, type=float, default=0.5,
+    help="Latência máxima de detecção de um par, em segundos, antes de o governador reduzir a taxa")
+    ap.add_argument("-gray", "--gray", required=False, action="store_true",
+    help="Captura os frames já em escala de cinza (luminância da fonte quando suportado)")
+    ap.add_argument("-preprocess", "--preprocess", required=False, default=None,
+    help="Estágios de pré-processamento, ex.: gray,gaussian:5,equalize (ver preprocess.py)")
+    ap.add_argument("-display", "--display", required=False, action="store_true",
+    help="Apresenta os frames capturados na tela")
     args = vars(ap.parse_args())
 
     # Instancia uma FIFO para enfileirar os frames capturados
@@ -439,17 +970,66 @@ if __name__ == "__main__":
     # Saída: md 
     fifo = Queue(maxsize=20)
 
-    # Instancia um objeto FrameCapture
-    fc = FrameCapture(capture_path = args["capture_path"], 
-                      fifo_out = fifo,
-                      fps = args["source_fps"], 
-                      fps_percent = args["fps_percent"],
-                      resolution = args["source_resolution"],
-                      event_time = args["event_length"])
+    # Instancia o governador da taxa de amostragem, se solicitado
+    if args["governor"]:
+        from frameGovernor import FrameRateGovernor
+        governor = FrameRateGovernor(source_fps = args["source_fps"],
+                                     fps_percent = args["fps_percent"],
+                                     floor_percent = args["fps_floor"],
+                                     latency_budget = args["latency_budget"])
+    else:
+        governor = None
+
+    # Instancia um objeto FrameCapture (supervisionado, se solicitado)
+    capture_class = SupervisedFrameCapture if args["supervised"] else FrameCapture
+    fc = capture_class(capture_path = args["capture_path"], 
+                       fifo_out = fifo,
+                       fps = args["source_fps"], 
+                       fps_percent = args["fps_percent"],
+                       resolution = args["source_resolution"],
+                       event_time = args["event_length"],
+                       gray = args["gray"],
+                       governor = governor,
+                       display = args["display"],
+                       timestamps = True)
 
     # Instancia um objeto MotionDetector
     md = MotionDetector()
 
+    # Instancia um suavizador para as decisões do MotionDetector
+    ms = MotionSmoother(on_threshold = args["am_on"],
+                        off_threshold = args["am_off"],
+                        min_on = args["min_on"],
+                        min_off = args["min_off"])
+
+    # Instancia o mapa de calor e de regiões de movimento
+    from motionMap import MotionMap
+    mm = MotionMap()
+
+    # Instancia o índice de assinaturas, se solicitado
+    if args["index"] is not None:
+        from signatureIndex import SignatureIndex
+        si = SignatureIndex(args["index"], mode = 'a')
+    else:
+        si = None
+
+    # Instancia o detector rápido, se algum modo além da FSM for escolhido
+    if args["mode"] == "integral":
+        from integralDetector import IntegralMotionDetector
+        fast_md = IntegralMotionDetector()
+    elif args["mode"] == "area":
+        from areaDetector import AreaMotionDetector
+        fast_md = AreaMotionDetector()
+    else:
+        fast_md = None
+
+    # Compila o plano de pré-processamento, se solicitado
+    if args["preprocess"] is not None:
+        from preprocess import PreprocessPlan
+        plan = PreprocessPlan(args["preprocess"])
+    else:
+        plan = None
+
     # Inicia as operações do objeto FrameCapture
     fc.start()
 
@@ -479,16 +1059,34 @@ if __name__ == "__main__":
             #   0: Prepara Frames
             if estado_atual == 0:
             
-                # Pega um par de frames na fifo
-                frame1 = fifo.get()
-                frame2 = fifo.get()
+                # Pega um par de frames na fifo, com os instantes de captura
+                # (usados no índice de assinaturas)
+                frame1, time1 = fifo.get()
+                frame2, time2 = fifo.get()
 
-                # Prepara o par de frame em escala de cinza e faz a concatenação unidimensional dos pixeis
-                # no vetor de intensidades I que é equivalente ao arquivo de pixel utilizado pelo Test Bench em VHDL)
-                I = concatenateGrayPair(frame1, frame2)
+                # Instante em que o par começou a ser processado (latência da detecção)
+                pair_time = time()
 
-                # Proximo estado será o Pega Pixel
-                proximo_estado = 1
+                # Nos modos rápidos, o par inteiro é processado de uma vez
+                if fast_md is not None:
+
+                    if plan is not None:
+                        frame1 = plan.run(frame1, 0)
+                        frame2 = plan.run(frame2, 1)
+
+                    md.am = fast_md.detect(frame1, frame2)
+
+                    # Proximo estado será o Verifica Movimento
+                    proximo_estado = 11
+
+                else:
+
+                    # Prepara o par de frame em escala de cinza e faz a concatenação unidimensional dos pixeis
+                    # no vetor de intensidades I que é equivalente ao arquivo de pixel utilizado pelo Test Bench em VHDL)
+                    I = concatenateGrayPair(frame1, frame2, plan)
+
+                    # Proximo estado será o Pega Pixel
+                    proximo_estado = 1
             
             #   1: Pega Pixel
             elif estado_atual == 1:
@@ -638,6 +1236,30 @@ if __name__ == "__main__":
                 print(f'am = {md.am}')
                 print(f'result = {movimento}')
 
+                # Atualiza o mapa com a máscara de chunks do par e informa as regiões
+                regions = mm.update(fast_md.mask if fast_md is not None else md.mask)
+                if regions:
+                    print(f'regions (x, y, w, h, chunks) = {regions}')
+
+                # Ajusta a taxa de amostragem com o resultado e a latência do par
+                if governor is not None:
+                    governor.update(movimento, time() - pair_time)
+
+                # Grava as assinaturas dos dois frames no índice (uma falha na
+                # gravação é informada, mas não interrompe a detecção)
+                if si is not None:
+                    try:
+                        si.appendPair(fast_md.means if fast_md is not None else md.means,
+                                      time1, time2)
+                    except (ValueError, OSError) as err:
+                        print(f'main: índice de assinaturas: {err}')
+
+                # Atualiza o suavizador, informando apenas as trocas de estado
+                try:
+                    ms.update(md.am)
+                except (Motion, NoMotion) as evt:
+                    print(f'main: {type(evt).__name__} ({evt})')
+
                 # Proximo estado será o Reset
                 proximo_estado = 12
             
@@ -665,8 +1287,17 @@ if __name__ == "__main__":
             # Encerra o objeto
             fc.stop()
             fc.free()
+            # Fecha o índice de assinaturas
+            if si is not None:
+                si.close()
+            # Informa o tempo médio de cada estágio do pré-processamento
+            if plan is not None:
+                for name, ms_per_frame in plan.timings().items():
+                    print(f'main: preprocess {name} = {ms_per_frame:.3f} ms/frame')
         
-    destroyAllWindows()
+    # Fecha as janelas da apresentação
+    if args["display"]:
+        closeWindows()
         
 
 
@@ -0,0 +1,119 @@
+##
+# @file motionMap.py
+# @brief Mapa de calor e regiões de movimento a partir da máscara de chunks do detector
+#
+#  Usa apenas a máscara binária de chunks que o detector já produz (30x40 na FSM),
+#  então o custo por par é proporcional à quantidade de chunks, e não de pixels.
+#  As regiões conectadas saem com bounding boxes em coordenadas de pixel, para que
+#  os estágios seguintes recortem o frame em vez de processá-lo inteiro.
+#
+
+from cv2 import connectedComponentsWithStats, CC_STAT_LEFT, CC_STAT_TOP, CC_STAT_WIDTH, CC_STAT_HEIGHT, CC_STAT_AREA
+import numpy as np
+
+class MotionMap():
+
+    ## @brief Instanciador da classe MotionMap
+    #
+    #  block: tamanho do chunk em pixels (altura, largura)
+    #  stride: passo entre chunks em pixels (vertical, horizontal)
+    #  decay: fator de decaimento do mapa de calor a cada par (0 a 1)
+    #  min_chunks: quantidade mínima de chunks para uma região ser reportada
+    #
+    def __init__(self,
+                 block = (16, 16),
+                 stride = (16, 16),
+                 decay = 0.9,
+                 min_chunks = 1):
+
+        self.block = block
+        self.stride = stride
+        self.decay = decay
+        self.min_chunks = min_chunks
+
+        print(f"MotionMap:\n\
+        \tblock = {self.block},\n\
+        \tstride = {self.stride},\n\
+        \tdecay = {self.decay},\n\
+        \tmin_chunks = {self.min_chunks}")
+
+        # Máscara do último par, mapa de calor e regiões (alocados no primeiro par)
+        self.mask = None
+        self.heatmap = None
+        self.regions = []
+
+    ## @brief Atualiza o mapa com a máscara de chunks de um novo par
+    #
+    #  Retorna a lista de regiões (x, y, largura, altura, chunks) em pixels.
+    #
+    def update(self, mask):
+
+        self.mask = np.asarray(mask, dtype=np.uint8)
+
+        # Mapa de calor com decaimento, atualizado no lugar
+        if self.heatmap is None or self.heatmap.shape != self.mask.shape:
+            self.heatmap = np.zeros(self.mask.shape, dtype=np.float32)
+
+        self.heatmap *= self.decay
+        self.heatmap += self.mask
+
+        self.regions = self.findRegions(self.mask)
+
+        return self.regions
+
+    ## @brief Encontra as regiões conectadas (vizinhança 8) da máscara de chunks
+    #
+    def findRegions(self, mask):
+
+        regions = []
+
+        # Sem chunks com movimento, não há regiões
+        if not mask.any():
+            return regions
+
+        count, labels, stats, centroids = connectedComponentsWithStats(mask, connectivity=8)
+
+        bh, bw = self.block
+        sy, sx = self.stride
+
+        # O rótulo 0 é o fundo
+        for label in range(1, count):
+
+            chunks = int(stats[label, CC_STAT_AREA])
+            if chunks < self.min_chunks:
+                continue
+
+            # Converte a caixa em chunks para pixels
+            c0 = int(stats[label, CC_STAT_LEFT])
+            l0 = int(stats[label, CC_STAT_TOP])
+            c1 = c0 + int(stats[label, CC_STAT_WIDTH]) - 1
+            l1 = l0 + int(stats[label, CC_STAT_HEIGHT]) - 1
+
+            x = c0 * sx
+            y = l0 * sy
+            regions.append((x, y, c1 * sx + bw - x, l1 * sy + bh - y, chunks))
+
+        # Regiões maiores primeiro
+        regions.sort(key = lambda region: region[4], reverse = True)
+
+        return regions
+
+    ## @brief Retorna o mapa de calor normalizado entre 0 e 1
+    #
+    def normalizedHeatmap(self):
+
+        if self.heatmap is None:
+            return None
+
+        # Valor máximo da soma geométrica com decaimento
+        limit = 1.0 / (1.0 - self.decay) if self.decay < 1 else self.heatmap.max() or 1.0
+
+        return np.clip(self.heatmap / limit, 0.0, 1.0)
+
+    ## @brief Zera o mapa de calor
+    #
+    def reset(self):
+
+        if self.heatmap is not None:
+            self.heatmap[:] = 0
+        self.regions = []
@@ -0,0 +1,203 @@
+##
+# @file preprocess.py
+# @brief Pipeline declarativo de pré-processamento dos frames do detector
+#
+#  Os estágios (ex.: "gray,gaussian:5,equalize") são compilados uma única vez, no
+#  primeiro frame, em uma sequência fixa de operações do OpenCV que escrevem em
+#  buffers pré-alocados (dst=). Não há alocação nem decisão por estágio a cada frame,
+#  e o tempo de cada estágio é acumulado para o relatório.
+#
+#  Estágios disponíveis:
+#    gray              -- BGR para escala de cinza (sempre o primeiro estágio, inserido se necessário)
+#    blur:k            -- média em janela k x k
+#    gaussian:k[:s]    -- filtro gaussiano k x k com desvio s (0 calcula pelo k)
+#    median:k          -- filtro de mediana k x k
+#    equalize          -- equalização do histograma
+#
+
+from time import perf_counter_ns
+from cv2 import (cvtColor, COLOR_BGR2GRAY, blur, GaussianBlur,
+                 medianBlur, equalizeHist)
+import numpy as np
+
+## @brief Converte a descrição textual dos estágios em uma lista de tuplas
+#
+#  "gray,blur:5,gaussian:5:1.5" -> [('gray',), ('blur', 5), ('gaussian', 5, 1.5)]
+#
+def parseStages(text):
+
+    stages = []
+
+    for item in text.split(','):
+
+        item = item.strip()
+        if not item:
+            continue
+
+        name, *params = item.split(':')
+        stages.append((name,) + tuple(float(p) if '.' in p else int(p) for p in params))
+
+    return stages
+
+class PreprocessPlan():
+
+    ## @brief Instanciador da classe PreprocessPlan
+    #
+    #  stages: lista de estágios (tuplas) ou texto no formato de parseStages
+    #  slots: quantidade de conjuntos de buffers (um por frame do par que precisa
+    #         continuar válido ao mesmo tempo)
+    #
+    def __init__(self,
+                 stages,
+                 slots = 2):
+
+        if isinstance(stages, str):
+            stages = parseStages(stages)
+
+        self.stages = [tuple(stage) for stage in stages]
+        self.slots = slots
+
+        # Verifica os estágios antes da compilação
+        for stage in self.stages:
+            self.validate(stage)
+
+        print(f"PreprocessPlan:\n\
+        \tstages = {self.stages},\n\
+        \tslots = {self.slots}")
+
+        # Plano compilado para o formato do primeiro frame
+        self.shape = None
+        self.plans = []
+
+        # Tempo acumulado (ns) e execuções de cada estágio
+        self.names = []
+        self.elapsed = []
+        self.count = 0
+
+    ## @brief Verifica o nome e os parâmetros de um estágio
+    #
+    #  Os erros aparecem na criação do plano, e não no primeiro frame.
+    #
+    def validate(self, stage):
+
+        name, params = stage[0], stage[1:]
+
+        def kernel(k, odd):
+            if not isinstance(k, int) or k < 1 or (odd and k % 2 == 0):
+                raise ValueError(f'{name}: tamanho de janela inválido {k!r} '
+                                 f'(inteiro positivo{" e ímpar" if odd else ""})')
+
+        if name in ('gray', 'equalize'):
+            if params:
+                raise ValueError(f'{name}: não recebe parâmetros {params}')
+
+        elif name == 'blur':
+            if len(params) != 1:
+                raise ValueError('blur: use blur:k')
+            kernel(params[0], odd = False)
+
+        elif name == 'gaussian':
+            if len(params) not in (1, 2):
+                raise ValueError('gaussian: use gaussian:k ou gaussian:k:s')
+            kernel(params[0], odd = True)
+            if len(params) == 2 and (not isinstance(params[1], (int, float)) or params[1] < 0):
+                raise ValueError(f'gaussian: desvio inválido {params[1]!r}')
+
+        elif name == 'median':
+            if len(params) != 1:
+                raise ValueError('median: use median:k')
+            kernel(params[0], odd = True)
+            if params[0] < 3:
+                raise ValueError(f'median: tamanho de janela inválido {params[0]!r} (mínimo 3)')
+
+        else:
+            raise ValueError(f'estágio desconhecido: {name}')
+
+    ## @brief Compila os estágios para o formato de frame recebido
+    #
+    def compile(self, shape):
+
+        self.shape = shape
+
+        # A conversão para escala de cinza é feita uma única vez, no início: frames
+        # coloridos começam por ela e frames já em escala de cinza a dispensam
+        stages = [stage for stage in self.stages if stage[0] != 'gray']
+        if len(shape) == 3:
+            stages.insert(0, ('gray',))
+
+        self.names = [':'.join(str(v) for v in stage) for stage in stages]
+        self.elapsed = [0] * len(stages)
+        self.count = 0
+
+        gray_shape = shape[:2]
+        self.plans = []
+
+        for slot in range(self.slots):
+
+            # Dois buffers alternados por slot: cada estágio lê de um e escreve no outro
+            buffers = [np.empty(gray_shape, dtype=np.uint8), np.empty(gray_shape, dtype=np.uint8)]
+            operations = []
+
+            for i, stage in enumerate(stages):
+                dst = buffers[i % 2]
+                operations.append(self.operation(stage, dst))
+
+            # Sem estágios, o frame passa direto
+            output = buffers[(len(stages) - 1) % 2] if stages else None
+            self.plans.append((operations, output))
+
+    ## @brief Cria a operação de um estágio escrevendo em dst
+    #
+    def operation(self, stage, dst):
+
+        name = stage[0]
+
+        if name == 'gray':
+            return lambda src: cvtColor(src, COLOR_BGR2GRAY, dst=dst)
+        elif name == 'blur':
+            k = (stage[1], stage[1])
+            return lambda src: blur(src, k, dst=dst)
+        elif name == 'gaussian':
+            k = (stage[1], stage[1])
+            sigma = stage[2] if len(stage) > 2 else 0
+            return lambda src: GaussianBlur(src, k, sigma, dst=dst)
+        elif name == 'median':
+            k = stage[1]
+            return lambda src: medianBlur(src, k, dst=dst)
+        else:
+            return lambda src: equalizeHist(src, dst=dst)
+
+    ## @brief Executa o plano em um frame
+    #
+    #  O resultado é um buffer do slot, válido até a próxima execução no mesmo slot.
+    #
+    def run(self, frame, slot = 0):
+
+        if self.shape != frame.shape:
+            self.compile(frame.shape)
+
+        operations, output = self.plans[slot]
+
+        if output is None:
+            return frame
+
+        src = frame
+        elapsed = self.elapsed
+
+        for i, operation in enumerate(operations):
+            start = perf_counter_ns()
+            src = operation(src)
+            elapsed[i] += perf_counter_ns() - start
+
+        self.count += 1
+
+        return output
+
+    ## @brief Tempo médio de cada estágio, em milissegundos por frame
+    #
+    def timings(self):
+
+        if self.count == 0:
+            return {}
+
+        return {name: total / self.count / 1e6 for name, total in zip(self.names, self.elapsed)}
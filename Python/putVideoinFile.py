@@ -1,11 +1,11 @@
 from cv2 import (VideoCapture, VideoWriter, VideoWriter_fourcc, 
-                 cvtColor, COLOR_BGR2GRAY, CAP_FFMPEG,
-                 imshow, waitKey, destroyAllWindows)
+                 cvtColor, COLOR_BGR2GRAY, CAP_FFMPEG)
 from threading import Thread, Event
 from exception import CaptureError
 from queue import Queue, Full, Empty
 import numpy as np
 from time import sleep
+import motionDetector_FSM
 
 
 class FrameCapture():
@@ -19,7 +19,8 @@ class FrameCapture():
                  fps = 15,
                  fps_percent = 40,
                  resolution = [640, 480],
-                 event_time = 3):
+                 event_time = 3,
+                 gray = False):
 
         # Define os parametros de captura
         self.path = capture_path
@@ -27,6 +28,7 @@ class FrameCapture():
         self.fps_percent = fps_percent
         self.source_resolution = resolution
         self.event_time = event_time #segundos
+        self.gray = gray
 
         # Apresenta os parâmetros na tela
         print(f"FrameCapture:\n\
@@ -34,14 +36,16 @@ class FrameCapture():
         \tsource_fps = {self.source_fps},\n\
         \tresolution = {self.source_resolution},\n\
         \treal_fps = {self.source_fps*fps_percent/100}\n\
-        \tevent_time = {self.event_time}")
+        \tevent_time = {self.event_time}\n\
+        \tgray = {self.gray}")
 
         # Tratando o caminho de captura pra webcam
         if self.path == '0':
             self.path = 0
 
-        # Instancia um objeto de captura de vídeo (via OpenCV)
-        self.cap = VideoCapture(self.path)
+        # O objeto de captura de vídeo só é aberto no start()
+        self.cap = None
+        self.luma_channel = None
 
         # Coloca como self a fila de saída
         self.fifo = fifo_out
@@ -57,10 +61,24 @@ class FrameCapture():
         # Instancia um controlador de eventos para thread de captura
         self.ready = Event()
 
+    ## @brief Método para abrir a fonte de captura
+    #
+    def open(self):
+
+        # Instancia um objeto de captura de vídeo (via OpenCV)
+        self.cap = VideoCapture(self.path)
+
+        # Solicita à fonte apenas o plano de luminância, quando suportado
+        self.luma_channel = self.requestLuma() if self.gray else None
+
     ## @brief Método para inicializar as operações da classe
     #
     def start(self):
 
+        # Abre a fonte de captura na primeira inicialização
+        if self.cap is None:
+            self.open()
+
         # Verifica se a thread está pausada
         if self.should_continue and not self.ready.isSet():
 
@@ -90,8 +108,6 @@ class FrameCapture():
         # Se a classe foi iniciada
         if self.should_continue:
 
-            destroyAllWindows()
-
             # Abaixa a flag de continuidade
             self.should_continue = False
 
@@ -104,10 +120,11 @@ class FrameCapture():
     #
     def free(self):
 
-        # Se a classe estiver parada
-        if not self.should_continue:
+        # Se a classe estiver parada (e a fonte tiver sido aberta)
+        if not self.should_continue and self.cap is not None:
             # Libera o objeto VideoCapture
             self.cap.release()
+            self.cap = None
 
             print("free: Liberando o objeto VideoCapture ")
 
@@ -154,6 +171,11 @@ class FrameCapture():
                 
                 self.ready.clear()
 
+    # Solicitação da luminância à fonte e conversão para escala de cinza, as mesmas
+    # do FrameCapture do detector
+    requestLuma = motionDetector_FSM.FrameCapture.requestLuma
+    toGray = motionDetector_FSM.FrameCapture.toGray
+
     ## @brief Método para capturar um frame
     #
     def capture(self):
@@ -195,6 +217,10 @@ class FrameCapture():
         #imshow('frame', frame)
         #waitKey(100)
 
+        # Deixa o frame em escala de cinza antes de enfileirar
+        if self.gray:
+            frame = self.toGray(frame)
+
         # retorna o frame capturado
         return frame
 
@@ -207,7 +233,8 @@ class VideoHandler():
                  fifo_in,
                  fps,
                  resolution,
-                 video_duration):
+                 video_duration,
+                 display = False):
 
         # Aloca o nome para os arquivos de vídeo e de texto
         self.name = name
@@ -228,6 +255,10 @@ class VideoHandler():
         self.frame_by_event = int(fps * video_duration)
         print(f'Total frames = {self.frame_by_event}')
 
+        # Apresenta os frames na tela enquanto grava
+        self.display = display
+        print(f'display = {self.display}')
+
     ## @brief
     #
     def run(self):
@@ -253,21 +284,27 @@ class VideoHandler():
 
         print(f'VH: Descritor de arquivo fd = {fd}')
 
+        # A interface gráfica do OpenCV só é importada quando a apresentação é usada
+        if self.display:
+            from cv2 import imshow, waitKey, destroyAllWindows
+
         # De acordo com o total de frames em um evento
         for i in range(self.frame_by_event):
 
             # Pega cada frame na fila
             frame = self.fifo.get_nowait()
             
-            # Coloca o frame em escala de cinza
-            frame = cvtColor(frame, COLOR_BGR2GRAY)
+            # Coloca o frame em escala de cinza (se a captura ainda não o fez)
+            if frame.ndim == 3:
+                frame = cvtColor(frame, COLOR_BGR2GRAY)
 
             # e o escreve no arquivo de vídeo
             #writer.write(frame) 
 
             # Apresenta o Frame na tela
-            imshow('Grayframe', frame)
-            waitKey(100)
+            if self.display:
+                imshow('Grayframe', frame)
+                waitKey(100)
 
             # monta um vetor de pixel do frame capturado
             pixel_vector = np.concatenate(frame)
@@ -277,7 +314,8 @@ class VideoHandler():
                 fd.write('{:08b}\n'.format(pixel))
 
         # Fecha as janela de apresentação dos frames
-        destroyAllWindows()
+        if self.display:
+            destroyAllWindows()
 
         print(f'VH: Todos os frames foram gravados no arquivo {self.name}.txt')
 
@@ -299,6 +337,8 @@ if __name__ == "__main__":
     help="Caminho para a fonte de captura")
     ap.add_argument("-name", "--file_name", required=True, 
     help="Nome do arquivo txt que será gerado")
+    ap.add_argument("-display", "--display", required=False, action="store_true",
+    help="Apresenta os frames na tela enquanto grava")
     args = vars(ap.parse_args())
 
     # Instancia uma FIFO para enfileirar os frames capturados
@@ -306,10 +346,11 @@ if __name__ == "__main__":
     fifo = Queue(maxsize=15*0.4*3)
 
     # Instancia um obejto FrameCapture
-    fc = FrameCapture(args["capture_path"], fifo)
+    # (o VideoHandler só usa escala de cinza, então a captura já entrega os frames assim)
+    fc = FrameCapture(args["capture_path"], fifo, gray = True)
 
     # Instancia um objeto VideoHandler
-    vh = VideoHandler(args["file_name"], fifo, 15*0.4, [640, 480], 3)
+    vh = VideoHandler(args["file_name"], fifo, 15*0.4, [640, 480], 3, args["display"])
 
     # Inicia as operações do objeto FrameCapture
     fc.start()
@@ -0,0 +1,268 @@
+##
+# @file sharedCapture.py
+# @brief Detecção em múltiplos processos com troca de frames por memória compartilhada
+#
+#  O FrameCapture escreve cada frame (em escala de cinza) em um slot de um bloco de
+#  multiprocessing.shared_memory e enfileira apenas os índices dos slots. Os processos
+#  de detecção mapeiam os mesmos slots sem cópia, calculam o am do par e devolvem os
+#  slots para a fila de slots livres. Assim, captura e detecção não disputam o GIL e
+#  nenhum frame é serializado (pickle) entre os processos.
+#
+
+from multiprocessing import Process, Queue
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty
+import numpy as np
+from exception import CaptureError
+from motionDetector_FSM import FrameCapture
+
+class SharedFramePool():
+
+    ## @brief Instanciador da classe SharedFramePool
+    #
+    #  Cria (create = True) ou mapeia (create = False) um bloco de memória
+    #  compartilhada com slots frames de formato shape.
+    #
+    def __init__(self,
+                 slots,
+                 shape,
+                 name = None,
+                 create = True):
+
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.frame_size = int(np.prod(self.shape))
+        self.create = create
+
+        # Aloca ou mapeia o bloco de memória compartilhada
+        self.shm = SharedMemory(name = name,
+                                create = create,
+                                size = self.slots * self.frame_size)
+        self.name = self.shm.name
+
+        # Visão de todos os slots como um único array (sem cópia)
+        self.frames = np.ndarray((self.slots,) + self.shape,
+                                 dtype = np.uint8,
+                                 buffer = self.shm.buf)
+
+    ## @brief Retorna a visão (sem cópia) do frame de um slot
+    #
+    def frame(self, index):
+
+        return self.frames[index]
+
+    ## @brief Método de liberação de memória da classe
+    #
+    def free(self):
+
+        # Descarta a visão antes de fechar o mapeamento
+        self.frames = None
+        self.shm.close()
+
+        # Apenas o processo criador remove o bloco do sistema
+        if self.create:
+            self.shm.unlink()
+
+class SharedFrameCapture(FrameCapture):
+
+    ## @brief Instanciador da classe SharedFrameCapture
+    #
+    #  fifo_out recebe tuplas (sequência, slot do frame 1, slot do frame 2)
+    #  free_slots contém os índices dos slots disponíveis para escrita
+    #
+    def __init__(self,
+                 capture_path,
+                 fifo_out,
+                 pool,
+                 free_slots,
+                 fps,
+                 fps_percent,
+                 resolution,
+                 event_time):
+
+        # Os slots guardam apenas frames em escala de cinza
+        super().__init__(capture_path, fifo_out, fps, fps_percent,
+                         resolution, event_time, gray = True)
+
+        self.pool = pool
+        self.free_slots = free_slots
+
+        # Slot do primeiro frame do par atual e contador de pares
+        self.pending = None
+        self.sequence = 0
+
+    ## @brief Método para enfileirar um frame capturado
+    #
+    #  Copia o frame para um slot livre e enfileira os índices quando o par fecha.
+    #
+    def enqueue(self, frame):
+
+        if frame.shape != self.pool.shape:
+            raise CaptureError(f'frame {frame.shape} incompatível com o slot {self.pool.shape}')
+
+        # Aguarda um slot livre, sem travar a finalização da thread
+        while True:
+            try:
+                index = self.free_slots.get(timeout = 1)
+                break
+            except Empty:
+                if not self.should_continue:
+                    return
+
+        # Escreve o frame direto na memória compartilhada
+        self.pool.frame(index)[:] = frame
+
+        if self.pending is None:
+            self.pending = index
+        else:
+            self.fifo.put((self.sequence, self.pending, index))
+            self.sequence += 1
+            self.pending = None
+
+## @brief Rotina dos processos de detecção
+#
+#  Mapeia os slots, processa os pares recebidos em fifo_in e escreve em results
+#  tuplas (sequência, am, resultado). Um None em fifo_in finaliza o processo.
+#
+def detectionWorker(name, slots, shape, fifo_in, free_slots, results, mode = 'integral'):
+
+    # Os detectores rápidos são importados apenas no processo de detecção
+    if mode == 'area':
+        from areaDetector import AreaMotionDetector
+        md = AreaMotionDetector()
+    else:
+        from integralDetector import IntegralMotionDetector
+        md = IntegralMotionDetector()
+
+    pool = SharedFramePool(slots, shape, name = name, create = False)
+
+    while True:
+
+        item = fifo_in.get()
+
+        # Sinal de finalização
+        if item is None:
+            break
+
+        sequence, index1, index2 = item
+
+        # Processa o par direto sobre a memória compartilhada
+        am = md.detect(pool.frame(index1), pool.frame(index2))
+        results.put((sequence, am, md.verificaMovimento()))
+
+        # Devolve os slots para a captura
+        free_slots.put(index1)
+        free_slots.put(index2)
+
+    pool.free()
+
+class MultiprocessDetector():
+
+    ## @brief Instanciador da classe MultiprocessDetector
+    #
+    def __init__(self,
+                 capture_path,
+                 workers = 2,
+                 slots = 16,
+                 fps = 15,
+                 fps_percent = 40,
+                 resolution = [640, 480],
+                 event_time = 3,
+                 mode = 'integral'):
+
+        # Cada par ocupa dois slots, então são necessários ao menos dois por processo
+        if slots < 2 * workers:
+            raise ValueError('slots deve ser ao menos 2 * workers')
+
+        self.workers = workers
+
+        print(f"MultiprocessDetector:\n\
+        \tworkers = {workers},\n\
+        \tslots = {slots},\n\
+        \tmode = {mode}")
+
+        # Bloco de memória compartilhada com frames em escala de cinza (altura, largura)
+        shape = (resolution[1], resolution[0])
+        self.pool = SharedFramePool(slots, shape)
+
+        # Filas de índices: slots livres, pares prontos e resultados
+        self.free_slots = Queue()
+        for index in range(slots):
+            self.free_slots.put(index)
+        self.fifo = Queue()
+        self.results = Queue()
+
+        # Capturador que escreve nos slots
+        self.fc = SharedFrameCapture(capture_path, self.fifo, self.pool, self.free_slots,
+                                     fps, fps_percent, resolution, event_time)
+
+        # Processos de detecção
+        self.processes = [Process(target = detectionWorker,
+                                  args = (self.pool.name, slots, shape, self.fifo,
+                                          self.free_slots, self.results, mode),
+                                  name = f'detectionWorker{i}',
+                                  daemon = True)
+                          for i in range(workers)]
+
+    ## @brief Método para inicializar as operações da classe
+    #
+    def start(self):
+
+        for process in self.processes:
+            process.start()
+
+        self.fc.start()
+
+    ## @brief Retorna o próximo resultado (sequência, am, resultado)
+    #
+    def get(self, timeout = None):
+
+        return self.results.get(timeout = timeout)
+
+    ## @brief Método de parada e liberação da classe
+    #
+    def stop(self):
+
+        # Para a captura e espera a thread sair do grab() e da escrita no slot
+        # (a espera por slot livre no enqueue é interrompida pelo stop)
+        self.fc.stop()
+        if self.fc.capture_thread.is_alive():
+            self.fc.capture_thread.join()
+        self.fc.free()
+
+        # Finaliza os processos de detecção
+        for process in self.processes:
+            self.fifo.put(None)
+        for process in self.processes:
+            process.join()
+
+        self.pool.free()
+
+if __name__ == "__main__":
+
+    # Recebendo os argumentos
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-pth", "--capture_path", required=True,
+    help="Caminho para a fonte de captura")
+    ap.add_argument("-workers", "--workers", required=False, type=int, default=2,
+    help="Quantidade de processos de detecção")
+    ap.add_argument("-slots", "--slots", required=False, type=int, default=16,
+    help="Quantidade de slots de frames na memória compartilhada")
+    ap.add_argument("-mode", "--mode", required=False, default="integral", choices=["integral", "area"],
+    help="Detector utilizado pelos processos de detecção")
+    args = vars(ap.parse_args())
+
+    mpd = MultiprocessDetector(args["capture_path"],
+                               workers = args["workers"],
+                               slots = args["slots"],
+                               mode = args["mode"])
+    mpd.start()
+
+    # Apresenta os resultados até o Ctrl+C
+    try:
+        while True:
+            sequence, am, result = mpd.get()
+            print(f'par = {sequence}, am = {am}, result = {result}')
+    except KeyboardInterrupt:
+        mpd.stop()
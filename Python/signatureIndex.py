@@ -0,0 +1,270 @@
+##
+# @file signatureIndex.py
+# @brief Índice persistente das assinaturas (médias dos chunks) de cada frame
+#
+#  Cada frame processado tem sua matriz de médias dos chunks (30x40 bytes = 1,2 KB)
+#  gravada com o instante de captura em arquivos apenas de acréscimo (append-only):
+#
+#    <nome>.sig  -- assinaturas em uint8, uma após a outra (coluna das assinaturas)
+#    <nome>.ts   -- instantes em float64, segundos desde a época (coluna do tempo)
+#    <nome>.json -- formato da assinatura
+#    <nome>.lock -- trava do processo que grava no índice
+#
+#  Os dois arquivos podem ser mapeados em memória (np.memmap), e as consultas de
+#  movimento por região e intervalo de tempo varrem apenas as assinaturas, sem
+#  decodificar o vídeo novamente.
+#
+
+import fcntl
+import json
+import os
+import numpy as np
+
+class SignatureIndex():
+
+    ## @brief Instanciador da classe SignatureIndex
+    #
+    #  name: caminho base dos arquivos do índice (sem extensão)
+    #  shape: formato da assinatura (linhas de chunks, colunas de chunks)
+    #  mode: 'r' para consultas (não altera os arquivos) ou 'a' para acrescentar
+    #        registros (cria o índice se necessário, trava e repara os arquivos)
+    #
+    def __init__(self,
+                 name,
+                 shape = (30, 40),
+                 mode = 'r'):
+
+        if mode not in ('r', 'a'):
+            raise ValueError(f"modo inválido: {mode} (use 'r' ou 'a')")
+
+        self.name = name
+        self.mode = mode
+        header = f'{self.name}.json'
+
+        # Arquivos de escrita (abertos no primeiro append) e trava do escritor
+        self.sig_fd = None
+        self.ts_fd = None
+        self.lock_fd = None
+
+        # Último instante gravado, para manter o índice de tempo ordenado
+        self.last_timestamp = None
+
+        # Um índice existente mantém o formato gravado
+        if os.path.exists(header):
+            with open(header) as fd:
+                self.shape = tuple(json.load(fd)['shape'])
+        elif self.mode == 'r':
+            raise FileNotFoundError(f'índice {self.name} não encontrado')
+        else:
+            self.shape = tuple(shape)
+            with open(header, 'w') as fd:
+                json.dump({'shape': list(self.shape)}, fd)
+
+        self.record_size = int(np.prod(self.shape))
+
+        if self.mode == 'a':
+
+            # Apenas um processo grava no índice
+            self.lock_fd = open(f'{self.name}.lock', 'w')
+            try:
+                fcntl.flock(self.lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self.lock_fd.close()
+                self.lock_fd = None
+                raise RuntimeError(f'índice {self.name} já está aberto para gravação por outro processo')
+
+            # Descarta registros incompletos de uma gravação interrompida
+            self.repair()
+
+    ## @brief Alinha os arquivos de um índice existente antes de acrescentar registros
+    #
+    #  Trunca as duas colunas na mesma quantidade de registros inteiros (uma gravação
+    #  interrompida pode deixar bytes soltos ou colunas de tamanhos diferentes) e
+    #  recupera o último instante gravado. Só é chamado com a trava do escritor: os
+    #  leitores nunca truncam, apenas ignoram o excesso em load().
+    #
+    def repair(self):
+
+        sig_path = f'{self.name}.sig'
+        ts_path = f'{self.name}.ts'
+
+        sig_size = os.path.getsize(sig_path) if os.path.exists(sig_path) else 0
+        ts_size = os.path.getsize(ts_path) if os.path.exists(ts_path) else 0
+
+        count = min(sig_size // self.record_size, ts_size // 8)
+
+        if sig_size != count * self.record_size or ts_size != count * 8:
+            print(f'SignatureIndex: truncando {self.name} em {count} registros')
+            for path, size in ((sig_path, count * self.record_size), (ts_path, count * 8)):
+                if os.path.exists(path):
+                    os.truncate(path, size)
+
+        if count > 0:
+            with open(ts_path, 'rb') as fd:
+                fd.seek((count - 1) * 8)
+                self.last_timestamp = float(np.frombuffer(fd.read(8), dtype=np.float64)[0])
+
+    ## @brief Acrescenta a assinatura de um frame ao índice
+    #
+    def append(self, signature, timestamp):
+
+        if self.mode != 'a':
+            raise ValueError(f"índice {self.name} aberto somente para leitura (use mode = 'a')")
+
+        signature = np.asarray(signature, dtype=np.uint8)
+
+        if signature.shape != self.shape:
+            raise ValueError(f'assinatura {signature.shape} diferente de {self.shape}')
+
+        # O índice de tempo precisa ser não decrescente: um relógio que volta no
+        # tempo (ajuste do NTP) tem o instante limitado ao último gravado
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            print(f'SignatureIndex: instante {timestamp} anterior ao último gravado '
+                  f'({self.last_timestamp}), usando o último')
+            timestamp = self.last_timestamp
+
+        if self.sig_fd is None:
+            self.sig_fd = open(f'{self.name}.sig', 'ab')
+            self.ts_fd = open(f'{self.name}.ts', 'ab')
+
+        self.sig_fd.write(signature.tobytes())
+        self.ts_fd.write(np.float64(timestamp).tobytes())
+        self.last_timestamp = timestamp
+
+    ## @brief Acrescenta as assinaturas dos dois frames de um par (means[2, linhas, colunas])
+    #
+    def appendPair(self, means, timestamp1, timestamp2):
+
+        self.append(means[0], timestamp1)
+        self.append(means[1], timestamp2)
+
+    ## @brief Grava em disco o que estiver em buffer
+    #
+    def flush(self):
+
+        if self.sig_fd is not None:
+            self.sig_fd.flush()
+            self.ts_fd.flush()
+
+    ## @brief Fecha os arquivos de escrita e libera a trava
+    #
+    def close(self):
+
+        if self.sig_fd is not None:
+            self.sig_fd.close()
+            self.ts_fd.close()
+            self.sig_fd = None
+            self.ts_fd = None
+
+        if self.lock_fd is not None:
+            self.lock_fd.close()
+            self.lock_fd = None
+
+    ## @brief Mapeia o índice em memória para leitura
+    #
+    #  Retorna (assinaturas[n, linhas, colunas], instantes[n]). Registros incompletos
+    #  no fim dos arquivos (gravação interrompida) são ignorados.
+    #
+    def load(self):
+
+        self.flush()
+
+        sig_path = f'{self.name}.sig'
+        ts_path = f'{self.name}.ts'
+
+        if not os.path.exists(sig_path) or not os.path.exists(ts_path):
+            return (np.zeros((0,) + self.shape, dtype=np.uint8),
+                    np.zeros(0, dtype=np.float64))
+
+        count = min(os.path.getsize(sig_path) // self.record_size,
+                    os.path.getsize(ts_path) // 8)
+
+        if count == 0:
+            return (np.zeros((0,) + self.shape, dtype=np.uint8),
+                    np.zeros(0, dtype=np.float64))
+
+        signatures = np.memmap(sig_path, dtype=np.uint8, mode='r', shape=(count,) + self.shape)
+        timestamps = np.memmap(ts_path, dtype=np.float64, mode='r', shape=(count,))
+
+        return signatures, timestamps
+
+    ## @brief Consulta os instantes com movimento em uma região e intervalo de tempo
+    #
+    #  region: (linha inicial, linha final, coluna inicial, coluna final) em chunks,
+    #          com os finais exclusivos; None usa o frame inteiro
+    #  threshold: limiar da diferença das médias entre frames consecutivos (como na FSM)
+    #  min_chunks: quantidade mínima de chunks da região com movimento
+    #  block: quantidade de registros varridos por vez (limita a memória usada)
+    #
+    #  Retorna um array com os instantes dos frames em que houve movimento na região.
+    #
+    def query(self, start = None, end = None, region = None, threshold = 15,
+              min_chunks = 1, block = 2048):
+
+        signatures, timestamps = self.load()
+
+        # Localiza o intervalo de tempo pelo índice ordenado
+        first = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        last = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+
+        # O primeiro frame do intervalo é comparado com o anterior, se existir
+        first = max(first, 1)
+
+        l0, l1, c0, c1 = region if region is not None else (0, self.shape[0], 0, self.shape[1])
+
+        hits = []
+
+        for i in range(first, last, block):
+
+            j = min(i + block, last)
+
+            # Diferença entre cada frame e o anterior, apenas na região
+            current = signatures[i:j, l0:l1, c0:c1].astype(np.int16)
+            previous = signatures[i-1:j-1, l0:l1, c0:c1].astype(np.int16)
+            moving = np.count_nonzero(np.abs(current - previous) > threshold, axis=(1, 2))
+
+            hits.append(np.asarray(timestamps[i:j])[moving >= min_chunks])
+
+        if not hits:
+            return np.zeros(0, dtype=np.float64)
+
+        return np.concatenate(hits)
+
+## @brief Converte um retângulo em pixels na região em chunks usada em query
+#
+def pixelRegion(x, y, width, height, chunk = 16):
+
+    return (y // chunk, -(-(y + height) // chunk), x // chunk, -(-(x + width) // chunk))
+
+if __name__ == "__main__":
+
+    # Recebendo os argumentos
+    import argparse
+    from datetime import datetime
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-index", "--index", required=True,
+    help="Caminho base do índice de assinaturas")
+    ap.add_argument("-start", "--start", required=False, default=None,
+    help="Início do intervalo (ISO 8601, ex.: 2021-03-26T08:00)")
+    ap.add_argument("-end", "--end", required=False, default=None,
+    help="Fim do intervalo (ISO 8601)")
+    ap.add_argument("-region", "--region", required=False, type=int, nargs=4, default=None,
+    help="Região em pixels: x y largura altura")
+    ap.add_argument("-min_chunks", "--min_chunks", required=False, type=int, default=1,
+    help="Quantidade mínima de chunks com movimento na região")
+    args = vars(ap.parse_args())
+
+    start = datetime.fromisoformat(args["start"]).timestamp() if args["start"] else None
+    end = datetime.fromisoformat(args["end"]).timestamp() if args["end"] else None
+    region = pixelRegion(*args["region"]) if args["region"] else None
+
+    try:
+        si = SignatureIndex(args["index"])
+    except FileNotFoundError as err:
+        raise SystemExit(f'query: {err}')
+
+    hits = si.query(start, end, region, min_chunks = args["min_chunks"])
+
+    print(f'{len(hits)} frames com movimento')
+    for timestamp in hits:
+        print(datetime.fromtimestamp(timestamp).isoformat())
@@ -0,0 +1,108 @@
+##
+# @file startupBenchmark.py
+# @brief Mede o tempo de inicialização de um processo detector de curta duração
+#
+#  Cada execução é um processo novo (como nos trabalhos em lote), e as fases são
+#  medidas desde o início do interpretador:
+#
+#    import       -- importação do motionDetector_FSM
+#    construct    -- FrameCapture + MotionDetector instanciados
+#    first_frame  -- primeiro frame disponível na fila após o start()
+#    process      -- processo inteiro, medido de fora (inclui o interpretador)
+#
+#  Com -dir é possível apontar para outra cópia do código (ex.: uma revisão antiga
+#  extraída com git worktree) e comparar os dois resultados.
+#
+
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+
+# Código executado em cada processo filho
+CHILD = r'''
+from time import perf_counter
+t0 = perf_counter()
+import contextlib, io, json, sys
+times = {}
+with contextlib.redirect_stdout(io.StringIO()):
+    import motionDetector_FSM as m
+    times['import'] = perf_counter() - t0
+    fifo = m.Queue(maxsize=20)
+    fc = m.FrameCapture(sys.argv[1], fifo, 15, 40, [640, 480], 3)
+    md = m.MotionDetector()
+    times['construct'] = perf_counter() - t0
+    fc.start()
+    try:
+        fifo.get(timeout=float(sys.argv[2]))
+        times['first_frame'] = perf_counter() - t0
+    except m.Empty:
+        times['first_frame'] = None
+    fc.stop()
+    while fc.capture_thread.is_alive():
+        try:
+            fifo.get(timeout=0.1)
+        except m.Empty:
+            pass
+    fc.free()
+print(json.dumps(times))
+'''
+
+## @brief Executa o processo filho uma vez e retorna os tempos das fases
+#
+def runOnce(module_dir, capture_path, timeout):
+
+    start = perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD, capture_path, str(timeout)],
+                            cwd = module_dir, capture_output = True, text = True)
+    elapsed = perf_counter() - start
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    times = json.loads(result.stdout.strip().splitlines()[-1])
+    times['process'] = elapsed
+
+    return times
+
+## @brief Executa o benchmark e retorna a mediana de cada fase, em milissegundos
+#
+def startupBenchmark(module_dir, capture_path, runs = 10, timeout = 5.0):
+
+    samples = [runOnce(module_dir, capture_path, timeout) for i in range(runs)]
+    report = {}
+
+    for phase in ('import', 'construct', 'first_frame', 'process'):
+        values = [s[phase] for s in samples if s[phase] is not None]
+        report[phase] = median(values) * 1000 if values else None
+
+    return report
+
+if __name__ == "__main__":
+
+    # Recebendo os argumentos
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-pth", "--capture_path", required=False,
+    default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'AuxFiles', 'Teste_Movimento.mp4'),
+    help="Fonte de vídeo usada na medição")
+    ap.add_argument("-runs", "--runs", required=False, type=int, default=10,
+    help="Quantidade de processos medidos")
+    ap.add_argument("-timeout", "--timeout", required=False, type=float, default=5.0,
+    help="Tempo máximo de espera pelo primeiro frame, em segundos")
+    ap.add_argument("-dir", "--module_dir", required=False, nargs="+",
+    default=[os.path.dirname(os.path.abspath(__file__))],
+    help="Diretórios com o motionDetector_FSM.py a comparar")
+    args = vars(ap.parse_args())
+
+    capture_path = os.path.abspath(args["capture_path"])
+
+    for module_dir in args["module_dir"]:
+
+        report = startupBenchmark(module_dir, capture_path, args["runs"], args["timeout"])
+
+        print(f'{module_dir} (mediana de {args["runs"]} processos):')
+        for phase, value in report.items():
+            print(f'\t{phase} = ' + ('sem frame' if value is None else f'{value:.1f} ms'))
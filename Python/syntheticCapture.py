@@ -0,0 +1,388 @@
+##
+# @file syntheticCapture.py
+# @brief Fonte de vídeo sintética e determinística para testes de carga e de precisão
+#
+#  A cena é gerada no próprio processo: fundo texturizado, objetos texturizados de
+#  tamanho e velocidade configuráveis (que alternam entre períodos em movimento e
+#  parados), variação lenta de iluminação e ruído gaussiano. Cada frame é função
+#  apenas da semente e do seu índice, então qualquer execução pode ser repetida, e
+#  a posição conhecida dos objetos fornece o rótulo de movimento (ground truth).
+#
+#  O SyntheticFrameCapture tem a mesma interface do FrameCapture (start, stop, free,
+#  fifo) e, por padrão, gera os frames sem limitar a velocidade.
+#
+
+import numpy as np
+from math import sin, pi
+from time import sleep, perf_counter, time
+from exception import CaptureError
+from motionDetector_FSM import FrameCapture, showFrame
+
+## @brief Gera uma textura em blocos (valores constantes em células cell x cell)
+#
+def blockTexture(rng, height, width, cell, low, high):
+
+    lines = -(-height // cell)
+    columns = -(-width // cell)
+    coarse = rng.integers(low, high, (lines, columns)).astype(np.float32)
+
+    return np.repeat(np.repeat(coarse, cell, axis=0), cell, axis=1)[:height, :width]
+
+class SyntheticScene():
+
+    ## @brief Instanciador da classe SyntheticScene
+    #
+    #  resolution: [largura, altura] dos frames
+    #  objects: lista de dicionários com os objetos da cena:
+    #      size (largura, altura), speed (vx, vy) em pixels por frame,
+    #      start (x, y), move / still (frames em movimento e parado por ciclo)
+    #  noise: desvio padrão do ruído gaussiano (níveis de cinza)
+    #  drift: amplitude da variação de iluminação (níveis de cinza)
+    #  drift_period: período da variação de iluminação, em frames
+    #  gray: gera frames em escala de cinza em vez de BGR
+    #
+    def __init__(self,
+                 resolution = [640, 480],
+                 objects = None,
+                 seed = 0,
+                 noise = 2.0,
+                 drift = 0.0,
+                 drift_period = 300,
+                 gray = False):
+
+        self.width, self.height = resolution
+        self.seed = seed
+        self.noise = noise
+        self.drift = drift
+        self.drift_period = drift_period
+        self.gray = gray
+
+        if objects is None:
+            objects = [{'size': (320, 240), 'speed': (32, 24)}]
+
+        rng = np.random.default_rng(seed)
+
+        # Fundo em blocos de 32 pixels
+        self.background = blockTexture(rng, self.height, self.width, 32, 40, 216)
+
+        # Objetos com textura própria em blocos de 16 pixels
+        self.objects = []
+        for obj in objects:
+
+            w, h = obj['size']
+            if w > self.width or h > self.height:
+                raise ValueError(f'objeto {obj["size"]} maior que o frame {resolution}')
+
+            self.objects.append({'size': (w, h),
+                                 'speed': tuple(obj.get('speed', (8, 0))),
+                                 'start': tuple(obj.get('start', (0, 0))),
+                                 'move': obj.get('move', 30),
+                                 'still': obj.get('still', 30),
+                                 'texture': blockTexture(rng, h, w, 16, 0, 256)})
+
+        # Próximo frame entregue pelo read/grab e rótulo do último frame lido
+        self.index = 0
+        self.last_label = None
+
+        print(f"SyntheticScene:\n\
+        \tresolution = {resolution},\n\
+        \tobjects = {[(o['size'], o['speed']) for o in self.objects]},\n\
+        \tseed = {self.seed},\n\
+        \tnoise = {self.noise},\n\
+        \tdrift = {self.drift}")
+
+    ## @brief Posição de um objeto no frame index
+    #
+    #  O objeto anda apenas nos frames de movimento do ciclo e rebate nas bordas.
+    #
+    def position(self, obj, index):
+
+        cycle = obj['move'] + obj['still']
+        t = (index // cycle) * obj['move'] + min(index % cycle, obj['move'])
+
+        position = []
+        for start, speed, size, limit in zip(obj['start'], obj['speed'], obj['size'],
+                                              (self.width, self.height)):
+
+            span = limit - size
+            if span == 0:
+                position.append(0)
+                continue
+
+            # Reflexão nas bordas: período de ida e volta igual a 2*span
+            p = (start + speed * t) % (2 * span)
+            position.append(int(p if p <= span else 2 * span - p))
+
+        return tuple(position)
+
+    ## @brief Rótulo do frame index: caixas dos objetos e se houve movimento desde o anterior
+    #
+    def label(self, index):
+
+        boxes = [self.position(obj, index) + obj['size'] for obj in self.objects]
+        previous = [self.position(obj, index - 1) + obj['size'] for obj in self.objects] if index > 0 else boxes
+
+        return {'index': index,
+                'boxes': boxes,
+                'motion': boxes != previous}
+
+    ## @brief Gera o frame index
+    #
+    def frame(self, index):
+
+        # Iluminação global
+        frame = self.background + self.drift * sin(2 * pi * index / self.drift_period)
+
+        for obj in self.objects:
+            x, y = self.position(obj, index)
+            w, h = obj['size']
+            frame[y:y+h, x:x+w] = obj['texture']
+
+        # Ruído próprio do frame (depende apenas da semente e do índice)
+        if self.noise > 0:
+            rng = np.random.default_rng([self.seed, index])
+            frame += self.noise * rng.standard_normal(frame.shape, dtype=np.float32)
+
+        frame = np.clip(frame, 0, 255).astype(np.uint8)
+
+        if not self.gray:
+            frame = np.repeat(frame[:, :, np.newaxis], 3, axis=2)
+
+        return frame
+
+    ## @brief Avança um frame sem gerá-lo (equivalente ao grab do VideoCapture)
+    #
+    def grab(self):
+
+        self.index += 1
+        return True
+
+    ## @brief Gera o próximo frame (mesmo retorno do read do VideoCapture: ret, frame)
+    #
+    #  O rótulo do frame gerado fica em last_label.
+    #
+    def read(self):
+
+        self.last_label = self.label(self.index)
+        frame = self.frame(self.index)
+        self.index += 1
+
+        return True, frame
+
+    ## @brief Nada a liberar (mantém a interface do VideoCapture)
+    #
+    def release(self):
+
+        pass
+
+class SyntheticFrameCapture(FrameCapture):
+
+    ## @brief Instanciador da classe SyntheticFrameCapture
+    #
+    #  Mesma interface do FrameCapture, com a cena sintética no lugar do VideoCapture
+    #  (criada no start(), como a abertura do VideoCapture).
+    #  frames: quantidade de frames da fonte (None para ilimitado); ao final, a captura
+    #          levanta CaptureError e pausa, como no fim de um arquivo de vídeo
+    #  realtime: limita a geração à velocidade da fonte (fps); por padrão é ilimitada
+    #  labels: enfileira o rótulo junto com o frame, (frame, rótulo) ou, com
+    #          timestamps, (frame, instante, rótulo)
+    #
+    def __init__(self,
+                 fifo_out,
+                 fps = 15,
+                 fps_percent = 100,
+                 resolution = [640, 480],
+                 event_time = 3,
+                 gray = False,
+                 governor = None,
+                 display = False,
+                 timestamps = False,
+                 frames = None,
+                 realtime = False,
+                 labels = False,
+                 **scene):
+
+        super().__init__('synthetic', fifo_out, fps, fps_percent, resolution,
+                         event_time, gray, governor, display, timestamps)
+
+        self.frames = frames
+        self.realtime = realtime
+        self.labels = labels
+        self.scene_args = scene
+
+        print(f"SyntheticFrameCapture:\n\
+        \tframes = {self.frames},\n\
+        \trealtime = {self.realtime},\n\
+        \tlabels = {self.labels}")
+
+        # Rótulo do último frame capturado
+        self.pending_label = None
+
+        # Instante do próximo frame no modo realtime
+        self.next_time = None
+
+    ## @brief Cria a cena sintética (no lugar do VideoCapture)
+    #
+    def open(self):
+
+        self.cap = SyntheticScene(resolution = self.source_resolution,
+                                  gray = self.gray,
+                                  **self.scene_args)
+
+    ## @brief Método para capturar um frame
+    #
+    def capture(self):
+
+        # Frames decimados de acordo com o fps_percent (ou com o governador)
+        percent = self.governor.percent if self.governor is not None else self.fps_percent
+        self.grab_credit += 100/percent
+        grabs = max(1, int(self.grab_credit))
+        self.grab_credit -= grabs
+
+        for j in range(grabs - 1):
+            self.cap.grab()
+
+        if self.frames is not None and self.cap.index >= self.frames:
+            raise CaptureError('end of synthetic source')
+
+        # No modo realtime, respeita o intervalo entre os frames da fonte
+        if self.realtime:
+            now = perf_counter()
+            if self.next_time is None:
+                self.next_time = now
+            self.next_time += grabs / self.source_fps
+            if self.next_time > now:
+                sleep(self.next_time - now)
+
+        ret, frame = self.cap.read()
+        self.pending_label = self.cap.last_label
+
+        # Instante de captura do frame (enfileirado com ele se timestamps = True)
+        self.frame_time = time()
+
+        # Apresenta o frame capturado na tela, se solicitado
+        if self.display:
+            showFrame('frame', frame)
+
+        return frame
+
+    ## @brief Método para enfileirar um frame capturado (com o seu rótulo, se solicitado)
+    #
+    #  O rótulo viaja no próprio item da fila: sai junto com o frame e não se acumula
+    #  quando o consumidor descarta frames.
+    #
+    def enqueue(self, frame):
+
+        if not self.labels:
+            super().enqueue(frame)
+        elif self.timestamps:
+            self.fifo.put((frame, self.frame_time, self.pending_label))
+        else:
+            self.fifo.put((frame, self.pending_label))
+
+## @brief Rótulo de movimento de um par: algum objeto mudou de posição entre os frames
+#
+def pairLabel(label1, label2):
+
+    return label1['boxes'] != label2['boxes']
+
+## @brief Mede a vazão e a precisão de um detector em pares da cena sintética
+#
+#  detector: objeto com detect(frame1, frame2) e verificaMovimento()
+#  step: frames da fonte entre os dois frames de um par (decimação)
+#  Retorna um dicionário com a vazão (pares/s) e a matriz de confusão.
+#
+def evaluate(scene, detector, pairs = 100, step = 1):
+
+    report = {'pairs': 0, 'seconds': 0.0, 'pairs_per_second': 0.0,
+              'true_positives': 0, 'false_positives': 0,
+              'true_negatives': 0, 'false_negatives': 0,
+              'precision': None, 'recall': None}
+
+    # Os frames são gerados antes, para medir apenas a detecção
+    index = 0
+    samples = []
+    for i in range(pairs):
+        samples.append((scene.frame(index), scene.frame(index + step),
+                        pairLabel(scene.label(index), scene.label(index + step))))
+        index += 2 * step
+
+    start = perf_counter()
+
+    for frame1, frame2, truth in samples:
+
+        detector.detect(frame1, frame2)
+        result = detector.verificaMovimento() == 1
+
+        if result and truth:
+            report['true_positives'] += 1
+        elif result:
+            report['false_positives'] += 1
+        elif truth:
+            report['false_negatives'] += 1
+        else:
+            report['true_negatives'] += 1
+
+    report['seconds'] = perf_counter() - start
+    report['pairs'] = len(samples)
+
+    if report['seconds'] > 0:
+        report['pairs_per_second'] = report['pairs'] / report['seconds']
+
+    positives = report['true_positives'] + report['false_positives']
+    if positives > 0:
+        report['precision'] = report['true_positives'] / positives
+
+    actual = report['true_positives'] + report['false_negatives']
+    if actual > 0:
+        report['recall'] = report['true_positives'] / actual
+
+    return report
+
+if __name__ == "__main__":
+
+    # Recebendo os argumentos
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", "--pairs", required=False, type=int, default=200,
+    help="Quantidade de pares de frames avaliados")
+    ap.add_argument("-mode", "--mode", required=False, default="integral", choices=["integral", "area"],
+    help="Detector avaliado")
+    ap.add_argument("-rsl", "--resolution", required=False, type=int, nargs=2, default=[640, 480],
+    help="Resolução dos frames: largura altura")
+    ap.add_argument("-seed", "--seed", required=False, type=int, default=0,
+    help="Semente da cena")
+    ap.add_argument("-noise", "--noise", required=False, type=float, default=2.0,
+    help="Desvio padrão do ruído, em níveis de cinza")
+    ap.add_argument("-drift", "--drift", required=False, type=float, default=0.0,
+    help="Amplitude da variação de iluminação, em níveis de cinza")
+    ap.add_argument("-object", "--object", required=False, type=int, nargs=4, action="append",
+    metavar=("W", "H", "VX", "VY"),
+    help="Objeto da cena: largura altura vx vy (pode ser repetido)")
+    ap.add_argument("-step", "--step", required=False, type=int, default=1,
+    help="Frames da fonte entre os dois frames de um par")
+    args = vars(ap.parse_args())
+
+    objects = None
+    if args["object"]:
+        objects = [{'size': (w, h), 'speed': (vx, vy)} for w, h, vx, vy in args["object"]]
+
+    scene = SyntheticScene(resolution = args["resolution"],
+                           objects = objects,
+                           seed = args["seed"],
+                           noise = args["noise"],
+                           drift = args["drift"],
+                           gray = True)
+
+    if args["mode"] == "area":
+        from areaDetector import AreaMotionDetector
+        detector = AreaMotionDetector()
+    else:
+        from integralDetector import IntegralMotionDetector
+        detector = IntegralMotionDetector()
+
+    report = evaluate(scene, detector, args["pairs"], args["step"])
+
+    print('Avaliação na cena sintética:')
+    for key, value in report.items():
+        print(f'\t{key} = {value}')
@@ -14,15 +14,20 @@ use IEEE.NUMERIC_STD.ALL;
 --use UNISIM.VComponents.all;
 
 entity motion_detector is
+    -- Quantidade de pixels de 8 bits entregues por vez em pixelValue
+        -- 1: um pixel por transferncia (modo original)
+        -- 4: quatro pixels empacotados em uma palavra de 32 bits (modo empacotado)
+    Generic ( PIXELS_PER_WORD : integer range 1 to 16 := 1);
     Port ( clk : in STD_LOGIC;
            start : in STD_LOGIC;
            reset : in STD_LOGIC;
            pixelAvailable : in STD_LOGIC; --_VECTOR (3 downto 0);
-           pixelValue : in STD_LOGIC_VECTOR (7 downto 0);
+           pixelValue : in STD_LOGIC_VECTOR (8*PIXELS_PER_WORD-1 downto 0);
            nextPixel : out STD_LOGIC;
-           --pixelPosition : out STD_LOGIC_VECTOR (3 downto 0); -- Apenas para testar o IP no overlay em python (recebe b)
-           --pixelAccumulator : out STD_LOGIC_VECTOR (15 downto 0); -- Apenas para testar o IP no overlay em python (recebe reg[0])
-           --motionAccumulator : out STD_LOGIC_VECTOR (10 downto 0); -- Apenas para testar o IP no overlay em python (recebe am)
+           pixelAck : out STD_LOGIC; -- Confirma que o valor em pixelValue foi lido neste ciclo
+           pixelPosition : out STD_LOGIC_VECTOR (3 downto 0); -- Apenas para testar o IP no overlay em python (recebe b)
+           pixelAccumulator : out STD_LOGIC_VECTOR (15 downto 0); -- Apenas para testar o IP no overlay em python (recebe reg[0])
+           motionAccumulator : out STD_LOGIC_VECTOR (10 downto 0); -- Apenas para testar o IP no overlay em python (recebe am)
            result : out STD_LOGIC;
            ready : out STD_LOGIC);
 end motion_detector;
@@ -73,6 +78,9 @@ architecture Behavioral of motion_detector is
 	-- Sinal para atualizar a sada result
 	signal s_result : STD_LOGIC;
 	
+	-- Palavra de pixels lida no estado getPixel
+	signal pixelWord : STD_LOGIC_VECTOR (8*PIXELS_PER_WORD-1 downto 0) := (others => '0');
+	
 	-- Contador de Bytes (0 <= b <= 16) (20 bits sem sinal)
     signal b : integer range 0 to 16 := 0;
     
@@ -163,11 +171,11 @@ begin
                 when accumulator =>
                     
                     -- Se ainda no completou a linha de pixels do chunk atual (16 bytes)
-                    if (b < 15) then
+                    if (b < 16 - PIXELS_PER_WORD) then
                         -- Proximo estado ser o Pega Pixel
                         next_state <= getPixel;
                     -- mas se j completou a linha do chunk
-                    elsif (b = 15) then
+                    elsif (b = 16 - PIXELS_PER_WORD) then
                         -- Proximo estado ser o Itera Seletora
                         next_state <= selIterator;
                     end if;
@@ -252,6 +260,12 @@ begin
                     next_state <= init;
                         
             end case; 
+            
+            -- Um start em qualquer estado reinicia o par: passa pelo init (contadores
+            -- zerados em ATT_SIGNALS) e segue direto para o Pega Pixel
+            if start = '1' then
+                next_state <= getPixel;
+            end if;
         
         
         end process;     
@@ -260,6 +274,9 @@ begin
         -- Receber as entradas
         -- Atualizar os contadores e registradores
     ATT_SIGNALS : process (clk, current_state, reset, start, pixelAvailable, pixelValue)
+    
+        -- Soma dos pixels da palavra lida
+        variable wordSum : unsigned (15 downto 0);
      
         begin  
         
@@ -290,6 +307,28 @@ begin
                     MC <= (others => (others => (others => '0')));
                     VM <= (others => '0');
                 
+                -- Start em qualquer estado: reincio suave, com o mesmo efeito do init
+                -- (um par interrompido no meio no deixa contadores nem mdias pela metade)
+                elsif start = '1' then
+                
+                    -- Abaixa as flags do par anterior
+                    s_ready <= '0';
+                    s_result <= '0';
+                    s_nextPixel <= '0';
+                    
+                    -- Zera os contadores
+                    b <= 0;
+                    sel <= 0;
+                    lp <= 0;
+                    lc <= 0;
+                    l <=0;
+                    am <= 0;
+                    
+                    -- Zera os registradores 
+                    reg <= (others => (others => '0'));
+                    MC <= (others => (others => (others => '0')));
+                    VM <= (others => '0');
+                
                 else
                 
                     -- trata as subrotina de cada um dos estados da FSM
@@ -329,6 +368,11 @@ begin
                             s_result <= '0';
                             
                             s_nextPixel <= '1';
+                            
+                            -- Guarda a palavra de pixels no ciclo em que ela  confirmada
+                            if pixelAvailable = '1' then
+                                pixelWord <= pixelValue;
+                            end if;
                                 
                         -- Estado Acumulador
                         when accumulator =>
@@ -336,11 +380,17 @@ begin
                             -- abaixa a flag de prximo pixel
                             s_nextPixel <= '0';
                         
-                            -- Acumula o valor do pixel na posio sel do vetor reg
-                            reg(sel) <= reg(sel) + unsigned(pixelValue);
+                            -- Soma os pixels da palavra (um nico pixel no modo original)
+                            wordSum := (others => '0');
+                            for k in 0 to PIXELS_PER_WORD-1 loop
+                                wordSum := wordSum + unsigned(pixelWord(8*k+7 downto 8*k));
+                            end loop;
+                            
+                            -- Acumula o valor dos pixels na posio sel do vetor reg
+                            reg(sel) <= reg(sel) + wordSum;
                             
-                            -- Incrementa o contador de bytes em uma unidade
-                            b <= b + 1;
+                            -- Incrementa o contador de bytes pela quantidade de pixels lidos
+                            b <= b + PIXELS_PER_WORD;
                        
                         -- Estado Itera Seletora
                         when selIterator =>
@@ -482,9 +532,10 @@ begin
    
     -- Atualiza as sadas       
     nextPixel <= s_nextPixel;
-    --pixelPosition <= std_logic_vector(to_unsigned(b, pixelPosition'length));
-    --pixelAccumulator <= std_logic_vector(reg(0));
-    --motionAccumulator <= std_logic_vector(to_unsigned(am, motionAccumulator'length));
+    pixelAck <= pixelAvailable when current_state = getPixel else '0';
+    pixelPosition <= std_logic_vector(to_unsigned(b, pixelPosition'length));
+    pixelAccumulator <= std_logic_vector(reg(0));
+    motionAccumulator <= std_logic_vector(to_unsigned(am, motionAccumulator'length));
     result <= s_result;
     ready <= s_ready;
             
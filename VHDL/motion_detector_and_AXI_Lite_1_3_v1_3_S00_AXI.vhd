@@ -6,6 +6,11 @@ entity motion_detector_and_AXI_Lite_1_3_v1_3_S00_AXI is
 	generic (
 		-- Users to add parameters here
 
+		-- Quantidade de pixels de 8 bits por escrita em slv_reg2
+		-- 1: modo original (pixelValue em slv_reg2 e pulso de pixelAvailable em slv_reg1)
+		-- 4: modo empacotado (quatro pixels por escrita em slv_reg2, sem escrita em slv_reg1)
+		C_PIXELS_PER_WORD	: integer	:= 1;
+
 		-- User parameters ends
 		-- Do not modify the parameters beyond this line
 
@@ -87,12 +92,14 @@ architecture arch_imp of motion_detector_and_AXI_Lite_1_3_v1_3_S00_AXI is
 
     -- Componente motion detector
     component motion_detector is
+    Generic ( PIXELS_PER_WORD : integer range 1 to 16 := 1);
     Port ( clk : in STD_LOGIC;
            start : in STD_LOGIC;
            reset : in STD_LOGIC;
            pixelAvailable : in STD_LOGIC; --STD_LOGIC_VECTOR (3 downto 0);
-           pixelValue : in STD_LOGIC_VECTOR (7 downto 0);
+           pixelValue : in STD_LOGIC_VECTOR (8*PIXELS_PER_WORD-1 downto 0);
            nextPixel : out STD_LOGIC;
+           pixelAck : out STD_LOGIC;
            pixelPosition : out STD_LOGIC_VECTOR (3 downto 0); -- Apenas para testar o IP no overlay em python (recebe b)
            pixelAccumulator : out STD_LOGIC_VECTOR (15 downto 0); -- Apenas para testar o IP no overlay em python (recebe reg[0])
            motionAccumulator : out STD_LOGIC_VECTOR (10 downto 0); -- Apenas para testar o IP no overlay em python (recebe am)
@@ -104,14 +111,21 @@ architecture arch_imp of motion_detector_and_AXI_Lite_1_3_v1_3_S00_AXI is
     signal s_reset : STD_LOGIC := '0';
     signal s_start : STD_LOGIC := '0';
     signal s_pixelAvailable : STD_LOGIC := '0'; --STD_LOGIC_VECTOR (3 downto 0) := (others => '0');
-    signal s_pixelValue : STD_LOGIC_VECTOR(7 downto 0) := (others => '0');
+    signal s_pixelValue : STD_LOGIC_VECTOR(8*C_PIXELS_PER_WORD-1 downto 0) := (others => '0');
     signal s_nextPixel : STD_LOGIC := '0';
+    signal s_pixelAck : STD_LOGIC := '0';
     signal s_pixelPosition : STD_LOGIC_VECTOR (3 downto 0) := (others => '0'); 
     signal s_pixelAccumulator : STD_LOGIC_VECTOR (15 downto 0) := (others => '0'); 
     signal s_motionAccumulator : STD_LOGIC_VECTOR(10 downto 0) := (others => '0');
     signal s_result : STD_LOGIC := '0';
     signal s_ready : STD_LOGIC := '0';
 
+    -- Sinais do modo empacotado
+    signal s_fsmPixelAvailable : STD_LOGIC := '0'; -- pixelAvailable entregue a FSM
+    signal s_wordValid : STD_LOGIC := '0'; -- palavra escrita em slv_reg2 ainda nao lida pela FSM
+    signal s_overrun : STD_LOGIC := '0'; -- palavra sobrescrita antes de ser lida (limpo no start)
+    signal s_packed : STD_LOGIC := '0'; -- '1' quando C_PIXELS_PER_WORD > 1
+
 
 	-- AXI4LITE signals
 	signal axi_awaddr	: std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
@@ -256,9 +270,15 @@ begin
 	      slv_reg6 <= (others => '0');
 	      slv_reg7 <= (others => '0');
 	      slv_reg8 <= (others => '0');
+	      s_wordValid <= '0';
+	      s_overrun <= '0';
 	    else
 	      s_start <= '0';
 	      s_pixelAvailable <= '0';
+	      -- Libera a palavra quando a FSM confirma a leitura
+	      if s_pixelAck = '1' then
+	        s_wordValid <= '0';
+	      end if;
 	      loc_addr := axi_awaddr(ADDR_LSB + OPT_MEM_ADDR_BITS downto ADDR_LSB);
 	      if (slv_reg_wren = '1') then
 	        case loc_addr is
@@ -271,6 +291,9 @@ begin
 	                s_start <= '1'; -- qualquer coisa escrita nesse registrador (slv_reg0), levantara a flag de start pra 1
 	              end if;
 	            end loop;
+	            -- Um novo start reinicia a FSM: descarta a palavra pendente e limpa a flag de sobrescrita
+	            s_wordValid <= '0';
+	            s_overrun <= '0';
 	          when b"0001" =>
 	            for byte_index in 0 to (C_S_AXI_DATA_WIDTH/8-1) loop
 	              if ( S_AXI_WSTRB(byte_index) = '1' ) then
@@ -289,6 +312,14 @@ begin
 	                --s_pixelAvailable <= '0';
 	              end if;
 	            end loop;
+	            -- No modo empacotado, a propria escrita da palavra sinaliza os novos pixels
+	            if C_PIXELS_PER_WORD > 1 then
+	              -- Se a palavra anterior ainda nao foi lida, ela foi perdida
+	              if s_wordValid = '1' and s_pixelAck = '0' then
+	                s_overrun <= '1';
+	              end if;
+	              s_wordValid <= '1';
+	            end if;
 	          when b"0011" =>
 	            for byte_index in 0 to (C_S_AXI_DATA_WIDTH/8-1) loop
 	              if ( S_AXI_WSTRB(byte_index) = '1' ) then
@@ -434,7 +465,7 @@ begin
 	-- and the slave is ready to accept the read address.
 	slv_reg_rden <= axi_arready and S_AXI_ARVALID and (not axi_rvalid) ;
 
-	process (s_start, s_pixelAvailable, s_pixelValue, s_nextPixel, s_pixelPosition, s_pixelAccumulator, s_motionAccumulator, s_ready, s_result, axi_araddr, S_AXI_ARESETN, slv_reg_rden)
+	process (s_start, s_pixelAvailable, s_pixelValue, s_nextPixel, s_pixelPosition, s_pixelAccumulator, s_motionAccumulator, s_ready, s_result, s_packed, s_overrun, s_wordValid, axi_araddr, S_AXI_ARESETN, slv_reg_rden)
 	variable loc_addr :std_logic_vector(OPT_MEM_ADDR_BITS downto 0);
 	begin
 	    -- Address decoding for reading registers
@@ -445,7 +476,7 @@ begin
 	      when b"0001" =>
 	        reg_data_out <= "0000000000000000000000000000000" & s_pixelAvailable; -- slv_reg1;
 	      when b"0010" =>
-	        reg_data_out <= "000000000000000000000000" & s_pixelValue; -- slv_reg2;
+	        reg_data_out <= (31-8*C_PIXELS_PER_WORD downto 0 => '0') & s_pixelValue; -- slv_reg2;
 	      when b"0011" =>
 	        reg_data_out <= "0000000000000000000000000000000" & s_nextPixel; -- slv_reg3;
 	      when b"0100" =>
@@ -458,6 +489,8 @@ begin
 	        reg_data_out <= "0000000000000000000000000000000" & s_ready; -- slv_reg7;
 	      when b"1000" =>
 	        reg_data_out <= "0000000000000000000000000000000" & s_result; -- slv_reg8;
+	      when b"1001" =>
+	        reg_data_out <= "00000000000000000000000000000" & s_wordValid & s_overrun & s_packed; -- status do modo empacotado;
 	      when others =>
 	        reg_data_out  <= (others => '0');
 	    end case;
@@ -485,17 +518,23 @@ begin
 	-- Add user logic here
 	s_reset <= not S_AXI_ARESETN;
     
-    -- Pega os 8 bits menos significativos do registrador slv_reg3 e coloca em pixelValue
-    s_pixelValue <= slv_reg2(7 downto 0);
+    -- Pega os 8*C_PIXELS_PER_WORD bits menos significativos do registrador slv_reg2 e coloca em pixelValue
+    s_pixelValue <= slv_reg2(8*C_PIXELS_PER_WORD-1 downto 0);
+    
+    -- No modo empacotado, a FSM le a palavra enquanto ela estiver valida
+    s_packed <= '1' when C_PIXELS_PER_WORD > 1 else '0';
+    s_fsmPixelAvailable <= s_wordValid when C_PIXELS_PER_WORD > 1 else s_pixelAvailable;
     
 	-- Faz o port map do componente motion_detector
 	UUT: motion_detector
+    generic map (PIXELS_PER_WORD => C_PIXELS_PER_WORD)
     port map (clk => S_AXI_ACLK,
               start => s_start,
               reset => s_reset,
-              pixelAvailable => s_pixelAvailable,
+              pixelAvailable => s_fsmPixelAvailable,
               pixelValue => s_pixelValue,
               nextPixel => s_nextPixel,
+              pixelAck => s_pixelAck,
               pixelPosition => s_pixelPosition,
               pixelAccumulator => s_pixelAccumulator,
               motionAccumulator => s_motionAccumulator,
@@ -25,6 +25,10 @@ architecture Behavioral of tb_motion_detector is
                pixelAvailable : in STD_LOGIC;
                pixelValue : in STD_LOGIC_VECTOR (7 downto 0);
                nextPixel : out STD_LOGIC;
+               pixelAck : out STD_LOGIC;
+               pixelPosition : out STD_LOGIC_VECTOR (3 downto 0);
+               pixelAccumulator : out STD_LOGIC_VECTOR (15 downto 0);
+               motionAccumulator : out STD_LOGIC_VECTOR (10 downto 0);
                result : out STD_LOGIC;
                ready : out STD_LOGIC);
     end  component;
@@ -59,6 +63,10 @@ begin
               pixelAvailable => s_pixelAvailable,
               pixelValue => s_pixelValue,
               nextPixel => s_nextPixel,
+              pixelAck => open,
+              pixelPosition => open,
+              pixelAccumulator => open,
+              motionAccumulator => open,
               result => s_result,
               ready => s_ready);
     